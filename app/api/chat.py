@@ -675,30 +675,132 @@ Chat API - Natural Conversational Flow (Like Claude)
 IMPROVED: Natural conversation, smart answer correction, better memory
 """
 
+import asyncio
+import json
 import uuid
+from contextvars import ContextVar
 from datetime import datetime  
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.models.schemas import ChatRequest, ChatResponse
 from app.core.config import settings
-from app.core.storage import (
-    load_conversation,
-    save_conversation,
-    get_form_by_id
+from app.core.session_context import SessionContext, session_locks
+from app.core.storage import VersionConflictError
+from app.services.ai_service import call_openai_chat, stream_openai_chat
+from app.services.conversation_summary import (
+    build_conversation_context,
+    build_matching_text,
+    clear_summary
 )
-from app.services.ai_service import call_openai_chat
-from app.services.form_matcher import match_form_from_conversation
+from app.services.form_matcher import match_form_from_conversation, clear_topic_state
 from app.services.question_generator import (
-    generate_question_for_field,
+    question_for_field,
     generate_help_for_field,
     is_help_request
 )
+from app.services.question_prefetch import question_prefetcher
 from app.services.answer_validator import validate_answer
+from app.services.bulk_answer_extractor import looks_like_bulk_answer, extract_multiple_answers
 from app.services.conversation_manager import ConversationManager
 from app.services.smart_answer_correction import detect_answer_correction
 
 router = APIRouter()
 
+# Set only while serving /chat/stream - conversational replies push deltas here
+_reply_stream: ContextVar[Optional[asyncio.Queue]] = ContextVar("reply_stream", default=None)
+
+
+async def generate_reply(
+    messages: List[dict],
+    system_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    call_site: str
+) -> str:
+    """
+    Generate a conversational reply
+    Streams deltas to the SSE client when called under /chat/stream,
+    returns the fully assembled message either way
+    """
+    queue = _reply_stream.get()
+    if queue is None:
+        return await call_openai_chat(
+            messages=messages,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            call_site=call_site
+        )
+    
+    parts = []
+    async for delta in stream_openai_chat(
+        messages=messages,
+        system_prompt=system_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        call_site=call_site
+    ):
+        parts.append(delta)
+        queue.put_nowait(delta)
+    
+    return "".join(parts).strip()
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat (Server-Sent Events)
+    
+    Events:
+        start - {"session_id": ...}
+        delta - {"content": ...} partial assistant text, in order
+        done  - full ChatResponse; its message is authoritative
+        error - {"detail": ...}
+    
+    The turn runs through the same state handlers as /chat, so history is
+    persisted once, after the reply has been fully assembled.
+    """
+    request.session_id = request.session_id or str(uuid.uuid4())
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    token = _reply_stream.set(queue)
+    try:
+        # The task copies the current context, so it sees the queue
+        turn = asyncio.create_task(chat(request))
+    finally:
+        _reply_stream.reset(token)
+    turn.add_done_callback(lambda _: queue.put_nowait(None))
+    
+    async def event_source():
+        yield _sse_event("start", {"session_id": request.session_id})
+        
+        while True:
+            delta = await queue.get()
+            if delta is None:
+                break
+            yield _sse_event("delta", {"content": delta})
+        
+        try:
+            response = turn.result()
+            yield _sse_event("done", response.model_dump())
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            print(f"Error in chat stream: {e}")
+            yield _sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
@@ -706,49 +808,82 @@ async def chat(request: ChatRequest):
     Main chat endpoint - Natural conversation like Claude
     """
     
-    # Initialize or load session
     session_id = request.session_id or str(uuid.uuid4())
-    data = await load_conversation(session_id)
+    
+    # Turns of one session run one at a time, in arrival order
+    async with session_locks.hold(session_id):
+        conflicts = 0
+        while True:
+            try:
+                return await run_turn(session_id, request.message)
+            except VersionConflictError as e:
+                # Another worker advanced this session - replay the turn on its state
+                conflicts += 1
+                if conflicts > settings.SESSION_CONFLICT_RETRIES:
+                    raise HTTPException(status_code=409, detail="Session was updated concurrently, please retry")
+                print(f"⚠️  {e} - replaying turn ({conflicts}/{settings.SESSION_CONFLICT_RETRIES})")
+
+
+async def run_turn(session_id: str, message: str) -> ChatResponse:
+    """Load the session, run the handler for its state, flush once"""
+    
+    # Initialize or load session
+    ctx = await SessionContext.load(session_id)
+    data = ctx.data
     
     if not data.get("history"):
         data["history"] = []
+        clear_summary(data)
+        clear_topic_state(data)
         data["state"] = settings.STATE_CHATTING
     
     current_state = data.get("state", settings.STATE_CHATTING)
     history = data["history"]
     
     print(f"\n{'='*60}")
-    print(f"Message: {request.message[:80]}...")
+    print(f"Message: {message[:80]}...")
     print(f"Current State: {current_state}")
     print(f"History Length: {len(history)}")
     print(f"{'='*60}\n")
     
+    try:
+        return await dispatch_state(ctx, current_state, message)
+    finally:
+        # One write per request, whatever the handlers changed
+        await ctx.flush()
+
+
+async def dispatch_state(ctx: SessionContext, current_state: str, message: str):
+    """Route the message to the handler for the conversation's current state"""
+    
     # STATE: COMPLETED
     if current_state == settings.STATE_COMPLETED:
-        return await handle_completed_state(session_id, data, request.message)
+        return await handle_completed_state(ctx, message)
     
     # STATE: FILLING_FORM
     if current_state == settings.STATE_FILLING_FORM:
-        return await handle_filling_form_state(session_id, data, request.message)
+        return await handle_filling_form_state(ctx, message)
     
     # STATE: AWAITING_CONFIRMATION
     if current_state == settings.STATE_AWAITING_CONFIRMATION:
-        return await handle_awaiting_confirmation_state(session_id, data, request.message)
+        return await handle_awaiting_confirmation_state(ctx, message)
     
     # STATE: FORM_MATCHED
     if current_state == settings.STATE_FORM_MATCHED:
-        return await handle_form_matched_state(session_id, data, request.message)
+        return await handle_form_matched_state(ctx, message)
     
     # STATE: CHATTING
-    return await handle_chatting_state(session_id, data, request.message, history)
+    return await handle_chatting_state(ctx, message)
 
 
 # ========== STATE HANDLERS ==========
 
-async def handle_completed_state(session_id: str, data: dict, message: str):
+async def handle_completed_state(ctx: SessionContext, message: str):
     """Handle conversation when form is completed"""
+    session_id = ctx.session_id
+    data = ctx.data
     form_id = data.get("matched_form_id")
-    form = await get_form_by_id(form_id)
+    form = await ctx.get_form(form_id)
     
     # Check if user wants a new form
     new_form_words = ["another", "new", "different", "next", "more"]
@@ -757,7 +892,9 @@ async def handle_completed_state(session_id: str, data: dict, message: str):
         data["matched_form_id"] = None
         data["current_field_index"] = 0
         data["history"] = []
-        await save_conversation(session_id, data)
+        clear_summary(data)
+        clear_topic_state(data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -786,14 +923,40 @@ async def handle_completed_state(session_id: str, data: dict, message: str):
     )
 
 
-async def handle_filling_form_state(session_id: str, data: dict, message: str):
+async def handle_filling_form_state(ctx: SessionContext, message: str):
     """Handle form filling with smart features"""
+    session_id = ctx.session_id
+    data = ctx.data
+    validation_task = None
+    bulk_task = None
     try:
-        # Check if user is correcting a previous answer
-        correction_result = await detect_answer_correction(session_id, message, data)
+        form = await ctx.get_form()
+        field, field_index, total_fields = await ConversationManager.get_current_field(ctx)
+        asking_help = is_help_request(message)
+        
+        # Correction check and answer validation are independent LLM calls -
+        # run them together; the decision order stays correction > help > answer
+        correction_task = asyncio.create_task(
+            detect_answer_correction(session_id, message, data, form=form)
+        )
+        if not asking_help:
+            validation_task = asyncio.create_task(validate_answer(field, message))
+            # Start the next field's question while the answer is validated
+            question_prefetcher.start(session_id, form, field_index + 1)
+            if looks_like_bulk_answer(message):
+                # The message may answer several fields at once
+                bulk_task = asyncio.create_task(extract_multiple_answers(
+                    message, form.get("fields", []), data.get("answers", {}), field_index
+                ))
+        
+        correction_result = await correction_task
         
         if correction_result["is_correction"]:
-            # User is fixing a previous answer
+            # User is fixing a previous answer - the answer branches lost
+            for task in (validation_task, bulk_task):
+                if task:
+                    task.cancel()
+            question_prefetcher.discard(session_id)
             corrected_field = correction_result["field"]
             new_answer = correction_result["new_answer"]
             
@@ -810,14 +973,13 @@ async def handle_filling_form_state(session_id: str, data: dict, message: str):
             
             # Save the corrected answer
             await ConversationManager.update_specific_answer(
-                session_id, 
+                ctx, 
                 corrected_field["id"], 
                 new_answer
             )
             
-            # Get current field to continue
-            current_field, idx, total = await ConversationManager.get_current_field(session_id)
-            next_question = await generate_question_for_field(current_field, idx, total)
+            # Continue with the current field
+            next_question = await question_for_field(form, field, field_index, total_fields)
             
             response_msg = f"Got it! I've updated your answer for '{corrected_field['label']}'. Now, let's continue: {next_question}"
             
@@ -828,14 +990,11 @@ async def handle_filling_form_state(session_id: str, data: dict, message: str):
                 is_form_ready=False
             )
         
-        # Get current field
-        field, field_index, total_fields = await ConversationManager.get_current_field(session_id)
-        
         print(f"Current Field: {field['label']} ({field_index + 1}/{total_fields})")
         print(f"User Message: {message[:100]}...")
         
         # Check if asking for help
-        if is_help_request(message):
+        if asking_help:
             print(f"User asking for help on field: {field['label']}")
             
             help_text = await generate_help_for_field(field, message)
@@ -852,28 +1011,43 @@ async def handle_filling_form_state(session_id: str, data: dict, message: str):
         # Process as answer
         print(f"Processing as answer...")
         
-        # Validate answer
-        is_valid, validation_msg = await validate_answer(field, message)
+        filled, rejected = await bulk_task if bulk_task else ({}, {})
         
-        if not is_valid:
-            invalid_response = f"{validation_msg} Could you provide that again? (Type 'help' if you need assistance)"
+        if len(filled) > 1:
+            # Several fields answered in one message - save them all
+            validation_task.cancel()
+            question_prefetcher.discard(session_id)
+            has_more_fields = await ConversationManager.save_answers(ctx, filled)
             
-            return ChatResponse(
-                session_id=session_id,
-                message=invalid_response,
-                state=settings.STATE_FILLING_FORM,
-                is_form_ready=False
-            )
-        
-        # Save answer and move to next
-        has_more_fields = await ConversationManager.save_answer(session_id, message)
+            labels = {f["id"]: f["label"] for f in form.get("fields", [])}
+            reply_prefix = f"Thanks! I filled in {len(filled)} fields from that: {', '.join(labels[i] for i in filled)}."
+            for field_id, feedback in rejected.items():
+                reply_prefix += f" I couldn't use your {labels[field_id]} ({feedback}), so I'll ask for it again."
+        else:
+            is_valid, validation_msg = await validation_task
+            
+            if not is_valid:
+                question_prefetcher.discard(session_id)
+                invalid_response = f"{validation_msg} Could you provide that again? (Type 'help' if you need assistance)"
+                
+                return ChatResponse(
+                    session_id=session_id,
+                    message=invalid_response,
+                    state=settings.STATE_FILLING_FORM,
+                    is_form_ready=False
+                )
+            
+            # Save answer and move to next
+            has_more_fields = await ConversationManager.save_answer(ctx, message)
+            reply_prefix = "Perfect!"
         
         if not has_more_fields:
             # Form completed!
-            await ConversationManager.transition_to_completed(session_id)
+            question_prefetcher.discard(session_id)
+            await ConversationManager.transition_to_completed(ctx)
             
             form_id = data.get("matched_form_id")
-            form = await get_form_by_id(form_id)
+            form = await ctx.get_form(form_id)
             
             completion_msg = f"Excellent! You've completed all {total_fields} fields of the {form['title']}. Your application information is ready! View your summary at /api/summary/{session_id}. Would you like to apply for another visa?"
             
@@ -886,10 +1060,12 @@ async def handle_filling_form_state(session_id: str, data: dict, message: str):
             )
         
         # Get next field
-        next_field, next_idx, total = await ConversationManager.get_current_field(session_id)
-        next_question = await generate_question_for_field(next_field, next_idx, total)
+        next_field, next_idx, total = await ConversationManager.get_current_field(ctx)
+        next_question = await question_prefetcher.take(session_id, await ctx.get_form(), next_idx)
+        if next_question is None:
+            next_question = await question_for_field(await ctx.get_form(), next_field, next_idx, total)
         
-        response_msg = f"Perfect! {next_question}\n\n(Need help? Just ask!)"
+        response_msg = f"{reply_prefix} {next_question}\n\n(Need help? Just ask!)"
         
         return ChatResponse(
             session_id=session_id,
@@ -899,20 +1075,26 @@ async def handle_filling_form_state(session_id: str, data: dict, message: str):
         )
     
     except Exception as e:
+        for task in (validation_task, bulk_task):
+            if task:
+                task.cancel()
+        question_prefetcher.discard(session_id)
         print(f"Error in filling form: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def handle_awaiting_confirmation_state(session_id: str, data: dict, message: str):
+async def handle_awaiting_confirmation_state(ctx: SessionContext, message: str):
     """Handle multiple form choices"""
+    session_id = ctx.session_id
+    data = ctx.data
     message_lower = message.lower()
     recommended_form = data.get("recommended_form")
     
     if not recommended_form:
         data["state"] = settings.STATE_CHATTING
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -927,11 +1109,11 @@ async def handle_awaiting_confirmation_state(session_id: str, data: dict, messag
     
     if any(word in message_lower for word in yes_words):
         await ConversationManager.transition_to_form_matched(
-            session_id,
+            ctx,
             recommended_form["form_id"]
         )
         
-        form = await get_form_by_id(recommended_form["form_id"])
+        form = await ctx.get_form(recommended_form["form_id"])
         
         ready_msg = f"Perfect! Let's proceed with the {form['title']} ({form['visa_type']}). This form has {len(form.get('fields', []))} fields to fill. Ready to begin? Just say 'yes' or 'let's start'!"
         
@@ -953,7 +1135,9 @@ async def handle_awaiting_confirmation_state(session_id: str, data: dict, messag
         data["state"] = settings.STATE_CHATTING
         data["recommended_form"] = None
         data["history"] = []
-        await save_conversation(session_id, data)
+        clear_summary(data)
+        clear_topic_state(data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -979,11 +1163,12 @@ Their response: "{message}"
 Respond naturally to clarify if this is the right form. Be conversational and helpful.
 End by asking if they'd like to proceed with this form."""
     
-    ai_response = await call_openai_chat(
-        messages=history,
+    ai_response = await generate_reply(
+        messages=await build_conversation_context(data, history),
         system_prompt=system_prompt,
         temperature=0.7,
-        max_tokens=200
+        max_tokens=200,
+        call_site="chat_awaiting_confirmation"
     )
     
     history.append({
@@ -993,7 +1178,7 @@ End by asking if they'd like to proceed with this form."""
     })
     
     data["history"] = history
-    await save_conversation(session_id, data)
+    ctx.mark_dirty()
     
     return ChatResponse(
         session_id=session_id,
@@ -1003,15 +1188,17 @@ End by asking if they'd like to proceed with this form."""
     )
 
 
-async def handle_form_matched_state(session_id: str, data: dict, message: str):
+async def handle_form_matched_state(ctx: SessionContext, message: str):
     """Handle form matched - natural conversation before starting"""
+    session_id = ctx.session_id
+    data = ctx.data
     message_lower = message.lower()
     form_id = data.get("matched_form_id")
-    form = await get_form_by_id(form_id)
+    form = await ctx.get_form(form_id)
     
     if not form:
         data["state"] = settings.STATE_CHATTING
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -1026,10 +1213,10 @@ async def handle_form_matched_state(session_id: str, data: dict, message: str):
     
     if any(word in message_lower for word in start_words):
         # Start filling form
-        await ConversationManager.transition_to_filling_form(session_id)
+        await ConversationManager.transition_to_filling_form(ctx)
         
-        field, idx, total = await ConversationManager.get_current_field(session_id)
-        question = await generate_question_for_field(field, idx, total)
+        field, idx, total = await ConversationManager.get_current_field(ctx)
+        question = await question_for_field(await ctx.get_form(), field, idx, total)
         
         start_msg = f"Great! Let's begin.\n\n{question}\n\n(Tip: You can ask for help anytime, or correct previous answers naturally by just mentioning what you want to change)"
         
@@ -1045,7 +1232,9 @@ async def handle_form_matched_state(session_id: str, data: dict, message: str):
         data["state"] = settings.STATE_CHATTING
         data["matched_form_id"] = None
         data["history"] = []
-        await save_conversation(session_id, data)
+        clear_summary(data)
+        clear_topic_state(data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -1075,11 +1264,12 @@ Respond naturally to their question. Be conversational, warm, and informative.
 Keep responses concise (2-3 sentences).
 Encourage them to start when ready by mentioning they can say "yes" or "let's begin"."""
     
-    ai_response = await call_openai_chat(
-        messages=history,
+    ai_response = await generate_reply(
+        messages=await build_conversation_context(data, history),
         system_prompt=system_prompt,
         temperature=0.7,
-        max_tokens=300
+        max_tokens=300,
+        call_site="chat_form_matched"
     )
     
     history.append({
@@ -1089,7 +1279,7 @@ Encourage them to start when ready by mentioning they can say "yes" or "let's be
     })
     
     data["history"] = history
-    await save_conversation(session_id, data)
+    ctx.mark_dirty()
     
     return ChatResponse(
         session_id=session_id,
@@ -1106,11 +1296,14 @@ Encourage them to start when ready by mentioning they can say "yes" or "let's be
     )
 
 
-async def handle_chatting_state(session_id: str, data: dict, message: str, history: list):
+async def handle_chatting_state(ctx: SessionContext, message: str):
     """
     Natural conversation to understand visa needs
     IMPROVED: More human-like, less robotic
     """
+    session_id = ctx.session_id
+    data = ctx.data
+    history = data["history"]
     
     history.append({
         "role": "user", 
@@ -1138,7 +1331,9 @@ Generate the greeting now:"""
             messages=[{"role": "user", "content": greeting_prompt}],
             system_prompt="You are a friendly visa consultant. Generate a natural, warm greeting.",
             temperature=0.8,
-            max_tokens=150
+            max_tokens=150,
+            cache_ttl=settings.GREETING_CACHE_TTL,
+            call_site="chat_greeting"
         )
         
         history.append({
@@ -1148,7 +1343,7 @@ Generate the greeting now:"""
         })
         
         data["history"] = history
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -1183,11 +1378,12 @@ Examples of good questions:
 
 Keep it natural and flowing!"""
     
-    ai_response = await call_openai_chat(
-        messages=history,
+    ai_response = await generate_reply(
+        messages=await build_conversation_context(data, history),
         system_prompt=system_prompt,
         temperature=0.8,
-        max_tokens=200
+        max_tokens=200,
+        call_site="chat_consultation"
     )
     
     history.append({
@@ -1197,16 +1393,24 @@ Keep it natural and flowing!"""
     })
     
     data["history"] = history
-    await save_conversation(session_id, data)
+    ctx.mark_dirty()
     
     # Try matching after enough conversation
     if user_msg_count >= settings.MIN_MESSAGES_FOR_MATCHING:
         print(f"Attempting form matching (messages: {user_msg_count})...")
         
-        matched = await match_form_from_conversation(history)
+        # Copy + reassign so the session delta picks up the updated verdict
+        topic_state = dict(data.get("topic_state") or {})
+        matched = await match_form_from_conversation(
+            history,
+            summary=data.get("summary"),
+            summary_upto=data.get("summary_upto", 0),
+            topic_state=topic_state
+        )
+        data["topic_state"] = topic_state
         
         if matched:
-            return await process_matching_result(session_id, data, matched, ai_response)
+            return await process_matching_result(ctx, matched, ai_response)
     
     return ChatResponse(
         session_id=session_id,
@@ -1216,8 +1420,10 @@ Keep it natural and flowing!"""
     )
 
 
-async def process_matching_result(session_id: str, data: dict, matched: dict, ai_response: str):
+async def process_matching_result(ctx: SessionContext, matched: dict, ai_response: str):
     """Process form matching results"""
+    session_id = ctx.session_id
+    data = ctx.data
     
     # OFF TOPIC
     if matched.get("form_id") == "OFF_TOPIC":
@@ -1249,12 +1455,12 @@ async def process_matching_result(session_id: str, data: dict, matched: dict, ai
                 is_form_ready=False
             )
         
-        recommendation = await ai_recommend_from_multiple(forms, data.get("history", []))
+        recommendation = await ai_recommend_from_multiple(forms, data)
         
         data["multiple_matched_forms"] = forms
         data["recommended_form"] = recommendation["recommended_form"]
         data["state"] = settings.STATE_AWAITING_CONFIRMATION
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
         
         return ChatResponse(
             session_id=session_id,
@@ -1266,7 +1472,7 @@ async def process_matching_result(session_id: str, data: dict, matched: dict, ai
     
     # PERFECT SINGLE MATCH
     if matched.get("visa_type"):
-        await ConversationManager.transition_to_form_matched(session_id, matched["form_id"])
+        await ConversationManager.transition_to_form_matched(ctx, matched["form_id"])
         
         match_msg = f"Perfect! I found exactly what you need: {matched['title']} ({matched['visa_type']} for {matched.get('country', 'N/A')}). This form has {len(matched.get('fields', []))} fields. Ready to start filling it out? Just say 'yes' when you're ready!"
         
@@ -1292,9 +1498,11 @@ async def process_matching_result(session_id: str, data: dict, matched: dict, ai
     )
 
 
-async def ai_recommend_from_multiple(forms: list, history: list) -> dict:
+async def ai_recommend_from_multiple(forms: list, data: dict) -> dict:
     """AI recommends best form from multiple matches"""
-    conversation_text = " ".join([m["content"] for m in history if m["role"] == "user"])
+    conversation_text = build_matching_text(
+        data, data.get("history", []), settings.MATCHING_CONTEXT_TOKEN_BUDGET
+    )
     
     forms_info = "\n".join([
         f"{i+1}. {f['title']} - {f['visa_type']} ({f.get('country', 'N/A')})"
@@ -1320,7 +1528,8 @@ Return JSON:
             messages=[{"role": "user", "content": recommend_prompt}],
             system_prompt="You are a visa expert. Be warm and conversational. Return only JSON.",
             temperature=0.7,
-            max_tokens=300
+            max_tokens=300,
+            call_site="form_recommendation"
         )
         
         if "```json" in response:
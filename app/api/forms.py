@@ -20,6 +20,9 @@ from app.services.s3_service import (
     generate_presigned_url  # ✅ Added this import
 )
 from app.services.ocr_service import analyze_form_with_vision
+from app.services.question_generator import schedule_question_bank_backfill
+from app.services.form_index import form_index
+from app.core.config import settings
 from app.core.storage import (
     save_form_to_db, 
     save_pdf_document,
@@ -86,7 +89,14 @@ async def upload_multiple_forms(files: List[UploadFile] = File(...)):
             form_data["s3_key"] = s3_data["s3_key"]
             
             # 6. Save to MongoDB
-            await save_form_to_db(form_data)
+            if not await save_form_to_db(form_data):
+                raise Exception("Failed to save form to database")
+            form_index.add(form_data)
+            
+            # 6b. Pre-generate the field questions in the background (served without
+            # an LLM call while filling; sessions that start first use the miss path)
+            if settings.QUESTION_BANK_ENABLED:
+                schedule_question_bank_backfill(form_data)
             
             # 7. Cleanup
             if os.path.exists(temp_path):
@@ -125,7 +135,7 @@ async def list_forms():
     """List all uploaded forms"""
     from app.core.storage import load_forms_db
     
-    forms = await load_forms_db()
+    forms = await load_forms_db(include_pages_data=True)
     
     return {
         "forms": forms,
@@ -208,6 +218,8 @@ async def delete_multiple_pdfs(request: DeletePDFsRequest):
                 # Delete from MongoDB
                 deleted_pdf = await delete_pdf_document(pdf_doc_id)
                 deleted_form = await delete_form_by_pdf_doc_id(pdf_doc_id)
+                if deleted_form:
+                    form_index.remove_by_pdf_doc_id(pdf_doc_id)
                 
                 if deleted_pdf:
                     # Add to S3 delete list
@@ -281,6 +293,8 @@ async def delete_single_pdf(pdf_doc_id: str):
         # Delete from MongoDB
         deleted_pdf = await delete_pdf_document(pdf_doc_id)
         deleted_form = await delete_form_by_pdf_doc_id(pdf_doc_id)
+        if deleted_form:
+            form_index.remove_by_pdf_doc_id(pdf_doc_id)
         
         # Delete from S3
         if s3_key:
@@ -0,0 +1,39 @@
+"""
+Metrics API - AI layer runtime counters
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.ai_service import get_ai_stats
+from app.services.ai_metrics import render_prometheus
+from app.core.storage import forms_cache, write_behind
+from app.core.session_context import session_locks
+from app.services.question_prefetch import question_prefetcher
+
+router = APIRouter()
+
+
+@router.get("/metrics/ai")
+async def ai_metrics():
+    """
+    Cache, governor, breaker and per-call-site statistics for the AI layer,
+    plus the in-process caches and session machinery around it
+    Usage: GET /api/metrics/ai
+    """
+    return {
+        "success": True,
+        "ai": get_ai_stats(),
+        "forms_cache": forms_cache.get_stats(),
+        "session_locks": session_locks.get_stats(),
+        "write_behind": write_behind.get_stats(),
+        "question_prefetch": question_prefetcher.get_stats()
+    }
+
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Per-call-site AI histograms in Prometheus text format
+    Usage: GET /api/metrics/prometheus
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -158,9 +158,25 @@ async def clear_chat_history(session_id: str):
     Usage: DELETE /api/chat-history/{session_id}
     """
     try:
+        from app.core.config import settings
+        from app.core.session_context import SessionContext, session_locks
+        from app.core.storage import VersionConflictError
         from app.services.conversation_manager import ConversationManager
         
-        await ConversationManager.reset_session(session_id)
+        async with session_locks.hold(session_id):
+            conflicts = 0
+            while True:
+                ctx = await SessionContext.load(session_id)
+                await ConversationManager.reset_session(ctx)
+                try:
+                    await ctx.flush()
+                    break
+                except VersionConflictError as e:
+                    # Another worker advanced this session - reset its latest state
+                    conflicts += 1
+                    if conflicts > settings.SESSION_CONFLICT_RETRIES:
+                        raise HTTPException(status_code=409, detail="Session was updated concurrently, please retry")
+                    print(f"⚠️  {e} - retrying reset ({conflicts}/{settings.SESSION_CONFLICT_RETRIES})")
         
         return {
             "success": True,
@@ -168,6 +184,8 @@ async def clear_chat_history(session_id: str):
             "message": "Chat history cleared successfully"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error clearing chat history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
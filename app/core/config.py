@@ -11,6 +11,7 @@ class Settings(BaseSettings):
     AWS_REGION: str = os.getenv("AWS_REGION", "")
     S3_BUCKET_NAME: str = os.getenv("S3_BUCKET_NAME", "")
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
     OPENAI_MODEL: str = "gpt-4o"
     OPENAI_VISION_MODEL: str = "gpt-4o"
     IMAGE_ZOOM: float = 2.0
@@ -20,6 +21,65 @@ class Settings(BaseSettings):
     CHAT_TEMPERATURE: float = 0.7
     CHAT_MAX_TOKENS: int = 500
     MIN_MESSAGES_FOR_MATCHING: int = 6
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2000
+    CHAT_HISTORY_KEEP_RECENT: int = 6
+    MATCHING_CONTEXT_TOKEN_BUDGET: int = 1500
+    CORRECTION_CONTEXT_TOKEN_BUDGET: int = 300
+    CONVERSATION_SUMMARY_ENABLED: bool = True
+    SUMMARY_REFRESH_EVERY: int = 8
+    SUMMARY_KEEP_RECENT: int = 6
+    SUMMARY_MAX_TOKENS: int = 200
+    FORMS_CACHE_ENABLED: bool = True
+    FORMS_CACHE_TTL: int = 300
+    FORMS_CACHE_CHANGE_STREAM: bool = False
+    SESSION_OPTIMISTIC_LOCKING: bool = False
+    SESSION_CONFLICT_RETRIES: int = 2
+    SESSION_WRITE_BEHIND: bool = False
+    WRITE_BEHIND_FLUSH_INTERVAL: float = 0.5
+    WRITE_BEHIND_MAX_SESSIONS: int = 10000
+    QUESTION_BANK_ENABLED: bool = True
+    QUESTION_BATCH_TOKEN_BUDGET: int = 3000
+    QUESTION_PREFETCH_AHEAD: int = 5
+    QUESTION_PREFETCH_ENABLED: bool = True
+    QUESTION_BATCH_WAIT: float = 3.0
+    BULK_EXTRACTION_ENABLED: bool = True
+    BULK_EXTRACTION_MIN_CHARS: int = 80
+    BULK_EXTRACTION_MAX_FIELDS: int = 60
+    FORM_SHORTLIST_ENABLED: bool = True
+    FORM_SHORTLIST_K: int = 15
+    FORM_SHORTLIST_MIN_CATALOG: int = 30
+    INTENT_FAST_PATH_ENABLED: bool = True
+    MATCH_CACHE_TTL: int = 3600
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_MAX_ENTRIES: int = 2000
+    AI_CACHE_DISK_DIR: str = ""
+    AI_CACHE_PROMOTE_TTL: int = 300
+    GREETING_CACHE_TTL: int = 3600
+    QUESTION_CACHE_TTL: int = 86400
+    VALIDATION_CACHE_TTL: int = 3600
+    TOPIC_CACHE_TTL: int = 3600
+    AI_SINGLE_FLIGHT_ENABLED: bool = True
+    OPENAI_RPM_LIMIT: int = 500
+    OPENAI_TPM_LIMIT: int = 150000
+    AI_CONCURRENCY_MIN: int = 2
+    AI_CONCURRENCY_MAX: int = 64
+    AI_CONCURRENCY_INITIAL: int = 16
+    AI_CONCURRENCY_BACKOFF: float = 0.5
+    AI_BACKGROUND_MAX_SHARE: float = 0.5
+    OPENAI_TIMEOUT: float = 60.0
+    OPENAI_BACKGROUND_TIMEOUT: float = 180.0
+    AI_MAX_RETRIES: int = 3
+    AI_RETRY_BASE_DELAY: float = 0.5
+    AI_RETRY_MAX_DELAY: float = 8.0
+    AI_HEDGE_ENABLED: bool = False
+    AI_HEDGE_PERCENTILE: float = 0.95
+    AI_HEDGE_MIN_DELAY: float = 1.0
+    AI_HEDGE_MIN_SAMPLES: int = 20
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    AI_CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    AI_CIRCUIT_HALF_OPEN_PROBES: int = 1
+    OPENAI_PRICE_INPUT_PER_1K: float = 0.0025
+    OPENAI_PRICE_OUTPUT_PER_1K: float = 0.01
     STATE_CHATTING: str = "chatting"
     STATE_FORM_MATCHED: str = "form_matched"
     STATE_AWAITING_CONFIRMATION: str = "awaiting_confirmation"
@@ -16,6 +16,13 @@ async def connect_to_mongodb():
     mongodb.db = mongodb.client[settings.MONGODB_DB_NAME]
     print(f"✅ MongoDB Connected: {settings.MONGODB_DB_NAME}")
 
+async def ensure_indexes():
+    """One conversation document per session (upserts cannot race into duplicates)"""
+    try:
+        await mongodb.db.conversations.create_index("session_id", unique=True)
+    except Exception as e:
+        print(f"⚠️  Index creation failed: {e}")
+
 async def close_mongodb_connection():
     if mongodb.client:
         mongodb.client.close()
@@ -0,0 +1,119 @@
+"""
+Per-request Session Context
+Loads the conversation (and its form) once per /api/chat request; handlers
+and ConversationManager mutate it in memory and the request flushes a single
+write at the end instead of a load/save pair per step.
+The write is a delta (see diff_conversation) for documents that already exist.
+
+Concurrent turns for one session are serialized by session_locks (in-process);
+with SESSION_OPTIMISTIC_LOCKING the write is also conditional on the document
+version, so turns racing across workers surface as VersionConflictError
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.storage import (
+    load_conversation,
+    insert_conversation,
+    save_conversation,
+    save_conversation_delta,
+    snapshot_conversation,
+    diff_conversation,
+    get_form_by_id
+)
+
+
+class SessionLocks:
+    """
+    One asyncio.Lock per active session_id - turns of the same session run in
+    arrival order (asyncio locks are FIFO), different sessions never wait on
+    each other. Entries are dropped once nobody holds or waits on them.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+        self.stats = {"acquired": 0, "contended": 0}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._holders[session_id] = self._holders.get(session_id, 0) + 1
+        if lock.locked():
+            self.stats["contended"] += 1
+        
+        try:
+            async with lock:
+                self.stats["acquired"] += 1
+                yield
+        finally:
+            self._holders[session_id] -= 1
+            if self._holders[session_id] == 0:
+                del self._holders[session_id]
+                del self._locks[session_id]
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["active_sessions"] = len(self._locks)
+        return stats
+
+
+session_locks = SessionLocks()
+
+
+class SessionContext:
+    """In-memory view of one conversation for the duration of a request"""
+
+    def __init__(self, session_id: str, data: Dict):
+        self.session_id = session_id
+        self.data = data
+        self.dirty = False
+        self._forms: Dict[str, Optional[Dict]] = {}
+        # Every persisted document carries updated_at; fresh sessions need a full write
+        self.is_new = "updated_at" not in data
+        self._snapshot = snapshot_conversation(data)
+
+    @classmethod
+    async def load(cls, session_id: str) -> "SessionContext":
+        return cls(session_id, await load_conversation(session_id))
+
+    async def get_form(self, form_id: Optional[str] = None) -> Optional[Dict]:
+        """Form by id (default: the matched form), fetched at most once per request"""
+        form_id = form_id or self.data.get("matched_form_id")
+        if not form_id:
+            return None
+        if form_id not in self._forms:
+            self._forms[form_id] = await get_form_by_id(form_id)
+        return self._forms[form_id]
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    async def flush(self) -> bool:
+        """Persist the conversation if anything changed"""
+        if not self.dirty:
+            return True
+        versioned = settings.SESSION_OPTIMISTIC_LOCKING
+        if self.is_new and versioned:
+            self.data["version"] = 1
+            saved = await insert_conversation(self.session_id, self.data)
+        elif self.is_new:
+            saved = await save_conversation(self.session_id, self.data)
+        else:
+            update = diff_conversation(self._snapshot, self.data)
+            saved = await save_conversation_delta(
+                self.session_id,
+                update,
+                self.data,
+                expected_version=self.data.get("version", 0) if versioned else None
+            )
+        
+        self.is_new = False
+        self.dirty = False
+        self._snapshot = snapshot_conversation(self.data)
+        return saved
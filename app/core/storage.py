@@ -2,11 +2,19 @@
 MongoDB Storage Operations - UPDATED with PDF management
 """
 
+import asyncio
+import copy
+import hashlib
 import json
 import os
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
 from app.core.database import (
     get_conversations_collection,
     get_forms_collection,
@@ -21,12 +29,18 @@ os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
 
 async def load_conversation(session_id: str) -> Dict:
     """Load conversation from MongoDB (ASYNC)"""
+    if settings.SESSION_WRITE_BEHIND:
+        cached = write_behind.get(session_id)
+        if cached is not None:
+            return cached
     try:
         collection = get_conversations_collection()
         doc = await collection.find_one({"session_id": session_id})
         
         if doc:
             doc.pop("_id", None)
+            if settings.SESSION_WRITE_BEHIND:
+                write_behind.remember(session_id, doc)
             return doc
         else:
             return {
@@ -44,6 +58,10 @@ async def load_conversation(session_id: str) -> Dict:
 
 async def save_conversation(session_id: str, data: Dict) -> bool:
     """Save conversation to MongoDB (ASYNC)"""
+    if settings.SESSION_WRITE_BEHIND:
+        data["session_id"] = session_id
+        write_behind.stage(session_id, data)
+        return True
     try:
         collection = get_conversations_collection()
         data["session_id"] = session_id
@@ -59,6 +77,325 @@ async def save_conversation(session_id: str, data: Dict) -> bool:
         print(f"⚠️  MongoDB write failed: {e}")
         return _save_local_conversation(session_id, data)
 
+# ========== CONVERSATION DELTAS ==========
+
+# Fields that only move forward during a turn; increases are written with $inc
+COUNTER_FIELDS = ("current_field_index",)
+
+def snapshot_conversation(data: Dict) -> Dict:
+    """
+    Cheap snapshot for diff_conversation
+    Top-level fields are compared by value (callers reassign them); history is
+    tracked by list identity + length, answers by entry
+    """
+    history = data.get("history")
+    answers = data.get("answers")
+    return {
+        "fields": {k: v for k, v in data.items() if k not in ("history", "answers")},
+        "history_ref": history,
+        "history_len": len(history) if isinstance(history, list) else 0,
+        "answers": dict(answers) if isinstance(answers, dict) else answers
+    }
+
+def diff_conversation(snapshot: Dict, data: Dict) -> Dict:
+    """
+    Mongo update document with only what changed since snapshot:
+    $push for appended history, $set answers.<field_id> per changed answer,
+    $inc for counters, $set/$unset for other top-level fields
+    """
+    set_ops, unset_ops, inc_ops, push_ops = {}, {}, {}, {}
+    before = snapshot["fields"]
+    
+    for key, value in data.items():
+        if key in ("history", "answers", "_id"):
+            continue
+        if key in before and (before[key] is value or before[key] == value):
+            continue
+        old = before.get(key)
+        if (key in COUNTER_FIELDS and isinstance(value, int) and isinstance(old, int)
+                and not isinstance(value, bool) and value > old):
+            inc_ops[key] = value - old
+        else:
+            set_ops[key] = value
+    
+    for key in before:
+        if key not in data:
+            unset_ops[key] = ""
+    
+    # History: appends to the same list become $push, anything else a full $set
+    history = data.get("history")
+    base_len = snapshot["history_len"]
+    if history is snapshot["history_ref"] and isinstance(history, list) and len(history) >= base_len:
+        if len(history) > base_len:
+            push_ops["history"] = {"$each": history[base_len:]}
+    elif history is None:
+        if snapshot["history_ref"] is not None:
+            unset_ops["history"] = ""
+    else:
+        set_ops["history"] = history
+    
+    # Answers: per-field $set unless entries were removed
+    answers = data.get("answers")
+    old_answers = snapshot["answers"]
+    if answers is None:
+        if old_answers is not None:
+            unset_ops["answers"] = ""
+    elif not isinstance(old_answers, dict) or any(k not in answers for k in old_answers):
+        set_ops["answers"] = answers
+    else:
+        for field_id, entry in answers.items():
+            if old_answers.get(field_id) != entry:
+                set_ops[f"answers.{field_id}"] = entry
+    
+    update = {}
+    for op, fields in (("$set", set_ops), ("$unset", unset_ops), ("$inc", inc_ops), ("$push", push_ops)):
+        if fields:
+            update[op] = fields
+    return update
+
+class VersionConflictError(Exception):
+    """Another worker saved the conversation since it was loaded"""
+
+async def insert_conversation(session_id: str, data: Dict) -> bool:
+    """
+    First write of a new conversation under optimistic locking (ASYNC)
+    Raises VersionConflictError if another worker created the session first
+    (session_id is uniquely indexed)
+    """
+    if settings.SESSION_WRITE_BEHIND:
+        return await save_conversation(session_id, data)
+    try:
+        collection = get_conversations_collection()
+        data["session_id"] = session_id
+        data["updated_at"] = datetime.utcnow().isoformat()
+        # insert_one adds _id to the document it is given
+        await collection.insert_one(dict(data))
+        return True
+    except DuplicateKeyError:
+        raise VersionConflictError(f"Conversation {session_id} was created by another worker")
+    except Exception as e:
+        print(f"⚠️  MongoDB insert failed: {e}")
+        return _save_local_conversation(session_id, data)
+
+async def save_conversation_delta(
+    session_id: str,
+    update: Dict,
+    data: Dict,
+    expected_version: Optional[int] = None
+) -> bool:
+    """
+    Apply a diff_conversation update (ASYNC)
+    `data` is the full document, only used for the local-file fallback
+    
+    With expected_version the write only applies if the stored document still
+    has that version (optimistic locking) and bumps it; otherwise raises
+    VersionConflictError (not in write-behind mode, which relies on sticky
+    sessions and the in-process session lock instead)
+    """
+    if not update:
+        return True
+    if settings.SESSION_WRITE_BEHIND:
+        write_behind.stage(session_id, data, update)
+        return True
+    try:
+        collection = get_conversations_collection()
+        now = datetime.utcnow().isoformat()
+        data["updated_at"] = now
+        update.setdefault("$set", {})["updated_at"] = now
+        
+        query = {"session_id": session_id}
+        if expected_version is not None:
+            # Documents written before versioning was enabled have no version field
+            query["version"] = expected_version if expected_version else {"$in": [0, None]}
+            update.setdefault("$inc", {})["version"] = 1
+        
+        result = await collection.update_one(
+            query,
+            update,
+            upsert=expected_version is None
+        )
+    except Exception as e:
+        print(f"⚠️  MongoDB delta write failed: {e}")
+        return _save_local_conversation(session_id, data)
+    
+    if expected_version is not None:
+        if result.matched_count == 0:
+            raise VersionConflictError(f"Conversation {session_id} changed since version {expected_version}")
+        data["version"] = expected_version + 1
+    return True
+
+# ========== WRITE-BEHIND SESSION STORE ==========
+
+FULL_REWRITE = "full"
+
+def merge_updates(first: Dict, second: Dict) -> Optional[Dict]:
+    """
+    Combine two update documents into one equivalent update
+    Returns None when they touch overlapping paths in incompatible ways
+    (the caller then rewrites the whole document instead)
+    """
+    merged = {op: dict(fields) for op, fields in first.items()}
+    for op, fields in second.items():
+        for path, value in fields.items():
+            for other_op, other_fields in merged.items():
+                for other_path in other_fields:
+                    same = other_path == path
+                    nested = other_path.startswith(path + ".") or path.startswith(other_path + ".")
+                    if nested or (same and other_op != op):
+                        return None
+            
+            target = merged.setdefault(op, {})
+            if path not in target or op in ("$set", "$unset"):
+                target[path] = value
+            elif op == "$inc":
+                target[path] += value
+            elif op == "$push":
+                target[path] = {"$each": target[path]["$each"] + value["$each"]}
+            else:
+                return None
+    return merged
+
+
+class WriteBehindStore:
+    """
+    Optional in-memory session store (SESSION_WRITE_BEHIND)
+    Turns are acknowledged once their changes are staged here; a background
+    task merges each session's pending updates and writes all dirty sessions
+    with one bulk_write every WRITE_BEHIND_FLUSH_INTERVAL seconds.
+    Loads are served from memory, so a deployment must route a session to one
+    worker (sticky sessions). Shutdown flushes everything.
+    """
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending: Dict[str, object] = {}  # session_id -> update doc | FULL_REWRITE
+        self._in_flight: set = set()
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"staged": 0, "flushes": 0, "writes": 0, "merged": 0, "failures": 0}
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Copy of the cached document (history/answers copied so turns can mutate them)"""
+        doc = self._sessions.get(session_id)
+        if doc is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        result = dict(doc)
+        if isinstance(doc.get("history"), list):
+            result["history"] = list(doc["history"])
+        if isinstance(doc.get("answers"), dict):
+            result["answers"] = dict(doc["answers"])
+        return result
+
+    def remember(self, session_id: str, doc: Dict):
+        """
+        Cache a clean document read from Mongo
+        Stored as a deep copy: the caller edits `doc` during the turn, and only
+        state that is staged (i.e. will be flushed) may reach the cache
+        """
+        if session_id not in self._pending:
+            self._sessions[session_id] = copy.deepcopy(doc)
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    def stage(self, session_id: str, data: Dict, update: Optional[Dict] = None):
+        """Record a turn's changes; update=None means the whole document"""
+        now = datetime.utcnow().isoformat()
+        data["updated_at"] = now
+        self._sessions[session_id] = data
+        self._sessions.move_to_end(session_id)
+        self.stats["staged"] += 1
+        
+        pending = self._pending.get(session_id)
+        if update is None or pending == FULL_REWRITE:
+            self._pending[session_id] = FULL_REWRITE
+            return
+        
+        update = {op: dict(fields) for op, fields in update.items()}
+        update.setdefault("$set", {})["updated_at"] = now
+        if pending is None:
+            self._pending[session_id] = update
+            return
+        
+        merged = merge_updates(pending, update)
+        self._pending[session_id] = merged if merged is not None else FULL_REWRITE
+        self.stats["merged"] += 1
+
+    def _evict(self):
+        """Drop least recently used clean sessions beyond the size limit"""
+        excess = len(self._sessions) - settings.WRITE_BEHIND_MAX_SESSIONS
+        for session_id in list(self._sessions):
+            if excess <= 0:
+                break
+            if session_id not in self._pending and session_id not in self._in_flight:
+                del self._sessions[session_id]
+                excess -= 1
+
+    def _build_operation(self, session_id: str, pending):
+        if pending == FULL_REWRITE:
+            # Replace, not $set: fields the session dropped (e.g. topic_state
+            # after a reset) must not survive in Mongo
+            doc = dict(self._sessions[session_id])
+            doc.pop("_id", None)
+            return ReplaceOne({"session_id": session_id}, doc, upsert=True)
+        return UpdateOne({"session_id": session_id}, pending, upsert=True)
+
+    async def flush(self) -> int:
+        """Write all pending sessions in one bulk_write; returns sessions written"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            operations = [self._build_operation(sid, pending) for sid, pending in batch.items()]
+            self._in_flight = set(batch)
+            
+            written = False
+            try:
+                collection = get_conversations_collection()
+                await collection.bulk_write(operations, ordered=False)
+                written = True
+            except Exception as e:
+                self.stats["failures"] += 1
+                print(f"⚠️  Write-behind flush failed for {len(batch)} sessions: {e}")
+            finally:
+                # Failed or cancelled: keep them dirty - a full rewrite is correct whatever landed
+                self._in_flight = set()
+                if not written:
+                    for session_id in batch:
+                        self._pending[session_id] = FULL_REWRITE
+            
+            if not written:
+                return 0
+            
+            self.stats["flushes"] += 1
+            self.stats["writes"] += len(operations)
+            self._evict()
+            return len(operations)
+
+    async def run(self):
+        """Background flush loop (started from the app lifespan)"""
+        print(f"💾 Write-behind session store on (flush every {settings.WRITE_BEHIND_FLUSH_INTERVAL}s)")
+        while True:
+            await asyncio.sleep(settings.WRITE_BEHIND_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def shutdown(self):
+        """Durable final flush; falls back to local files if Mongo is unreachable"""
+        await self.flush()
+        for session_id in list(self._pending):
+            _save_local_conversation(session_id, self._sessions[session_id])
+        if self._pending:
+            print(f"⚠️  {len(self._pending)} sessions saved to local storage on shutdown")
+            self._pending.clear()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["cached_sessions"] = len(self._sessions)
+        stats["dirty_sessions"] = len(self._pending)
+        return stats
+
+
+write_behind = WriteBehindStore()
+
 def _load_local_conversation(session_id: str) -> Dict:
     """Fallback: Load from local file"""
     filepath = os.path.join(LOCAL_STORAGE_DIR, f"{session_id}.json")
@@ -81,13 +418,152 @@ def _save_local_conversation(session_id: str, data: Dict) -> bool:
         json.dump(data, f, indent=2)
     return True
 
+# ========== FORMS CACHE ==========
+
+class FormCache:
+    """
+    In-process copy of the forms collection (without pages_data)
+    Forms change only on upload/delete, so the chat hot path reads them from
+    memory. Local writes invalidate it; other workers' writes are picked up by
+    the optional change-stream listener or after FORMS_CACHE_TTL.
+    Cached forms are shared - treat them as read-only.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict] = {}
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.catalog_version = ""
+        self.stats = {"hits": 0, "loads": 0, "misses": 0, "invalidations": 0}
+
+    def _is_fresh(self) -> bool:
+        if not self._loaded:
+            return False
+        ttl = settings.FORMS_CACHE_TTL
+        return ttl <= 0 or time.monotonic() - self._loaded_at < ttl
+
+    async def _ensure_loaded(self):
+        if self._is_fresh():
+            self.stats["hits"] += 1
+            return
+
+        async with self._lock:
+            if self._is_fresh():
+                return
+            generation = self._generation
+            collection = get_forms_collection()
+            forms = await collection.find({}, {"pages_data": 0}).to_list(length=None)
+
+            by_id = {}
+            for form in forms:
+                form.pop("_id", None)
+                by_id[form.get("form_id")] = form
+            self._by_id = by_id
+            self.catalog_version = _catalog_fingerprint(forms)
+            self.stats["loads"] += 1
+
+            # A write that landed mid-load leaves the copy stale - reload next time
+            self._loaded = generation == self._generation
+            self._loaded_at = time.monotonic()
+            print(f"📚 Forms cache loaded: {len(by_id)} forms (version {self.catalog_version[:8]})")
+
+    async def all(self) -> List[Dict]:
+        await self._ensure_loaded()
+        return list(self._by_id.values())
+
+    async def get(self, form_id: str) -> Optional[Dict]:
+        await self._ensure_loaded()
+        form = self._by_id.get(form_id)
+        if form is None:
+            # Possibly written by another worker since our load
+            self.stats["misses"] += 1
+            form = await get_forms_collection().find_one({"form_id": form_id}, {"pages_data": 0})
+            if form:
+                form.pop("_id", None)
+                self.invalidate()
+        return form
+
+    def merge_questions(self, form_id: str, questions: Dict[str, str]):
+        """Add questions to one cached form's question_bank without a reload"""
+        if self._lock.locked():
+            # A load in flight may have read the old bank
+            self.invalidate()
+            return
+        form = self._by_id.get(form_id)
+        if form is None:
+            return
+        # Cached forms are shared: swap in a copy rather than mutating
+        bank = dict(form.get("question_bank") or {})
+        bank.update(questions)
+        self._by_id[form_id] = {**form, "question_bank": bank}
+
+    def invalidate(self):
+        self._generation += 1
+        self._loaded = False
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        lookups = self.stats["hits"] + self.stats["loads"]
+        stats["hit_rate"] = round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["forms"] = len(self._by_id)
+        stats["fresh"] = self._is_fresh()
+        stats["catalog_version"] = self.catalog_version
+        return stats
+
+
+def _catalog_fingerprint(forms: List[Dict]) -> str:
+    """Changes whenever a form is added, removed or re-saved"""
+    parts = sorted(f"{f.get('form_id')}:{f.get('updated_at', '')}" for f in forms)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+forms_cache = FormCache()
+
+
+async def get_forms_catalog_version() -> str:
+    """Fingerprint of the current form catalog (for keying derived caches)"""
+    try:
+        await forms_cache._ensure_loaded()
+    except Exception as e:
+        print(f"⚠️  Forms load failed: {e}")
+    return forms_cache.catalog_version
+
+
+async def watch_forms_changes():
+    """
+    Invalidate the forms cache on any write to the forms collection
+    (MongoDB change streams need a replica set; without one this exits and
+    the cache falls back to FORMS_CACHE_TTL)
+    """
+    try:
+        async with get_forms_collection().watch() as stream:
+            print("👀 Watching forms collection for changes")
+            async for change in stream:
+                forms_cache.invalidate()
+                print(f"🔄 Forms cache invalidated ({change.get('operationType')})")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"⚠️  Forms change stream unavailable: {e}")
+
+
 # ========== FORMS STORAGE ==========
 
-async def load_forms_db() -> List[Dict]:
-    """Load all forms from MongoDB (ASYNC)"""
+async def load_forms_db(include_pages_data: bool = False) -> List[Dict]:
+    """
+    Load all forms (ASYNC)
+    Served from the forms cache unless include_pages_data is requested
+    """
     try:
+        if settings.FORMS_CACHE_ENABLED and not include_pages_data:
+            return await forms_cache.all()
+        
         collection = get_forms_collection()
-        forms = await collection.find({}).to_list(length=None)
+        projection = None if include_pages_data else {"pages_data": 0}
+        forms = await collection.find({}, projection).to_list(length=None)
         for form in forms:
             form.pop("_id", None)
         return forms
@@ -98,8 +574,11 @@ async def load_forms_db() -> List[Dict]:
 async def get_form_by_id(form_id: str) -> Optional[Dict]:
     """Get single form by form_id (ASYNC)"""
     try:
+        if settings.FORMS_CACHE_ENABLED:
+            return await forms_cache.get(form_id)
+        
         collection = get_forms_collection()
-        form = await collection.find_one({"form_id": form_id})
+        form = await collection.find_one({"form_id": form_id}, {"pages_data": 0})
         if form:
             form.pop("_id", None)
             return form
@@ -122,12 +601,28 @@ async def save_form_to_db(form_data: Dict) -> bool:
             {"$set": form_data},
             upsert=True
         )
+        forms_cache.invalidate()
         print(f"✅ Form saved: {form_id}")
         return True
     except Exception as e:
         print(f"❌ Form save failed: {e}")
         return False
 
+async def save_form_questions(form_id: str, questions: Dict[str, str]) -> bool:
+    """Merge generated field questions into a form's question_bank (ASYNC)"""
+    try:
+        collection = get_forms_collection()
+        await collection.update_one(
+            {"form_id": form_id},
+            {"$set": {f"question_bank.{field_id}": q for field_id, q in questions.items()}}
+        )
+        forms_cache.merge_questions(form_id, questions)
+        print(f"✅ Questions saved: {form_id} ({len(questions)} questions)")
+        return True
+    except Exception as e:
+        print(f"❌ Question save failed: {e}")
+        return False
+
 # ========== PDF DOCUMENTS STORAGE ==========
 
 async def save_pdf_document(doc_data: Dict) -> str:
@@ -209,6 +704,8 @@ async def delete_form_by_pdf_doc_id(pdf_doc_id: str) -> bool:
     try:
         collection = get_forms_collection()
         result = await collection.delete_one({"pdf_doc_id": pdf_doc_id})
+        if result.deleted_count > 0:
+            forms_cache.invalidate()
         return result.deleted_count > 0
     except Exception as e:
         print(f"❌ Form delete failed: {e}")
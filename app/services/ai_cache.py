@@ -0,0 +1,223 @@
+"""
+AI Response Cache
+Content-addressed cache for OpenAI completions
+In-process LRU tier + optional on-disk tier, TTL per entry
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: Optional[str],
+    messages: List[Dict],
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """
+    Build a stable fingerprint for a completion request
+    Only role/content of each message are used (timestamps etc. are ignored)
+    """
+    payload = {
+        "model": model,
+        "system_prompt": system_prompt or "",
+        "messages": [
+            {"role": m.get("role"), "content": m.get("content")}
+            for m in messages
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Base class for a cache tier"""
+
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+
+class MemoryLRUCache(CacheBackend):
+    """In-process LRU tier with per-entry expiry"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.time():
+            self._entries.pop(key, None)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache(CacheBackend):
+    """On-disk tier - one JSON file per key, survives restarts"""
+
+    name = "disk"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("expires_at", 0) < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        return entry.get("value")
+
+    def _write(self, key: str, value: str, ttl: float):
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"expires_at": time.time() + ttl, "value": value}, f)
+        os.replace(tmp_path, path)
+
+    def _clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        try:
+            await asyncio.to_thread(self._write, key, value, ttl)
+        except OSError as e:
+            print(f"⚠️  Disk cache write failed: {e}")
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+
+class ResponseCache:
+    """
+    Tiered response cache
+    Lookups go memory → disk; disk hits are promoted to memory
+    """
+
+    def __init__(self, tiers: List[CacheBackend]):
+        self.tiers = tiers
+        self.stats = {"hits": 0, "misses": 0, "sets": 0}
+        self.tier_hits = {tier.name: 0 for tier in tiers}
+
+    async def get(self, key: str) -> Optional[str]:
+        for i, tier in enumerate(self.tiers):
+            value = await tier.get(key)
+            if value is None:
+                continue
+
+            self.stats["hits"] += 1
+            self.tier_hits[tier.name] += 1
+
+            # Promote to faster tiers
+            for faster in self.tiers[:i]:
+                await faster.set(key, value, settings.AI_CACHE_PROMOTE_TTL)
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: float):
+        if ttl <= 0:
+            return
+        self.stats["sets"] += 1
+        for tier in self.tiers:
+            await tier.set(key, value, ttl)
+
+    async def clear(self):
+        for tier in self.tiers:
+            await tier.clear()
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        stats = dict(self.stats)
+        stats["hit_rate"] = round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["tier_hits"] = dict(self.tier_hits)
+        for tier in self.tiers:
+            if isinstance(tier, MemoryLRUCache):
+                stats["memory_entries"] = len(tier)
+                stats["memory_evictions"] = tier.evictions
+        return stats
+
+
+def build_response_cache(subdirectory: str = "") -> ResponseCache:
+    """
+    Build the cache from settings
+    subdirectory gives the disk tier its own folder under AI_CACHE_DISK_DIR
+    (DiskCache.clear deletes every entry in its directory)
+    """
+    tiers: List[CacheBackend] = [MemoryLRUCache(settings.AI_CACHE_MAX_ENTRIES)]
+    if settings.AI_CACHE_DISK_DIR:
+        tiers.append(DiskCache(os.path.join(settings.AI_CACHE_DISK_DIR, subdirectory)))
+    return ResponseCache(tiers)
+
+
+response_cache = build_response_cache()
+
+# Form-match decisions get their own tiers, counters and disk folder
+match_decision_cache = build_response_cache("match")
@@ -0,0 +1,249 @@
+"""
+OpenAI Rate Governor
+Shared admission control for every upstream OpenAI call:
+- Requests-per-minute and tokens-per-minute token buckets
+- AIMD concurrency limit (backs off on 429/5xx, grows on success)
+- Priority lanes: interactive chat traffic goes ahead of background OCR
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+LANE_INTERACTIVE = "interactive"
+LANE_BACKGROUND = "background"
+
+# Lower rank is served first
+LANE_RANKS = {LANE_INTERACTIVE: 0, LANE_BACKGROUND: 1}
+
+# Rough cost of one image input (high detail page scan)
+IMAGE_TOKEN_ESTIMATE = 1000
+
+
+def estimate_request_tokens(api_messages: List[Dict], max_tokens: int) -> int:
+    """Cheap upper-bound estimate: ~4 chars per token + the completion budget"""
+    prompt_tokens = 0
+    for message in api_messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    prompt_tokens += IMAGE_TOKEN_ESTIMATE
+                else:
+                    prompt_tokens += len(part.get("text", "")) // 4
+        else:
+            prompt_tokens += len(content or "") // 4
+        prompt_tokens += 4  # per-message overhead
+    return prompt_tokens + max_tokens
+
+
+def is_overload_error(error: Exception) -> bool:
+    """429s, 5xx and timeouts mean the upstream is saturated"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return "timeout" in type(error).__name__.lower()
+
+
+class TokenBucket:
+    """Continuous-refill bucket sized for one minute of budget"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        if self.enabled:
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Settle the difference between estimated and actual usage"""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class Lease:
+    """Handle for one admitted call; report actual usage through used_tokens"""
+
+    def __init__(self, lane: str, reserved_tokens: int):
+        self.lane = lane
+        self.reserved_tokens = reserved_tokens
+        self.used_tokens: Optional[int] = None
+        self.queued_seconds = 0.0
+
+
+class RateGovernor:
+    """
+    Admission control shared by all OpenAI calls in this process
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        min_concurrency: int,
+        max_concurrency: int,
+        initial_concurrency: int,
+        background_share: float
+    ):
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.background_share = background_share
+
+        self._cond = asyncio.Condition()
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.lane_in_flight = {lane: 0 for lane in LANE_RANKS}
+        self.stats = {
+            "admitted": 0,
+            "throttled": 0,
+            "errors": 0,
+            "cancelled": 0,
+            "limit_decreases": 0,
+            "queued_seconds_total": 0.0
+        }
+
+    def _lane_cap(self, lane: str) -> int:
+        cap = max(1, int(self.limit))
+        if lane == LANE_BACKGROUND:
+            # Leave headroom so bulk OCR can never occupy every slot
+            cap = max(1, int(cap * self.background_share))
+        return cap
+
+    def _admission_wait(self, ticket: tuple, lane: str, tokens: int) -> Optional[float]:
+        """0 = admit now, float = retry after that many seconds, None = wait for a release"""
+        if self._waiters[0] != ticket:
+            return None
+        if self.in_flight >= max(1, int(self.limit)):
+            return None
+        if self.lane_in_flight[lane] >= self._lane_cap(lane):
+            return None
+        return max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+
+    async def acquire(self, lane: str, tokens: int) -> float:
+        """Block until the call may go upstream; returns seconds spent queued"""
+        lane = lane if lane in LANE_RANKS else LANE_BACKGROUND
+        ticket = (LANE_RANKS[lane], next(self._seq))
+        started = time.monotonic()
+
+        async with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = self._admission_wait(ticket, lane, tokens)
+                    if wait == 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._waiters)
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+            self.in_flight += 1
+            self.lane_in_flight[lane] += 1
+            self.stats["admitted"] += 1
+            self._cond.notify_all()
+
+        queued = time.monotonic() - started
+        self.stats["queued_seconds_total"] += queued
+        return queued
+
+    async def release(self, lease: Lease, outcome: str):
+        """outcome: ok | throttled | error | cancelled (neutral: no AIMD change)"""
+        async with self._cond:
+            self.in_flight -= 1
+            self.lane_in_flight[lease.lane] -= 1
+
+            if lease.used_tokens is not None:
+                self._tokens.adjust(lease.used_tokens - lease.reserved_tokens)
+
+            if outcome == "throttled":
+                # Multiplicative decrease
+                self.limit = max(self.min_concurrency, self.limit * settings.AI_CONCURRENCY_BACKOFF)
+                self.stats["throttled"] += 1
+                self.stats["limit_decreases"] += 1
+            elif outcome == "ok":
+                # Additive increase: roughly +1 per `limit` successes
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            elif outcome == "cancelled":
+                # Losing hedge / abandoned request - says nothing about upstream health
+                self.stats["cancelled"] += 1
+            else:
+                self.stats["errors"] += 1
+
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, lane: str, tokens: int):
+        lane = lane if lane in LANE_RANKS else LANE_BACKGROUND
+        lease = Lease(lane, tokens)
+        lease.queued_seconds = await self.acquire(lane, tokens)
+        outcome = "error"
+        try:
+            yield lease
+            outcome = "ok"
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled call or abandoned stream (client went away)
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = "throttled" if is_overload_error(e) else "error"
+            raise
+        finally:
+            await self.release(lease, outcome)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["queued_seconds_total"] = round(stats["queued_seconds_total"], 3)
+        stats["concurrency_limit"] = round(self.limit, 2)
+        stats["in_flight"] = self.in_flight
+        stats["lane_in_flight"] = dict(self.lane_in_flight)
+        stats["waiting"] = len(self._waiters)
+        return stats
+
+
+governor = RateGovernor(
+    rpm=settings.OPENAI_RPM_LIMIT,
+    tpm=settings.OPENAI_TPM_LIMIT,
+    min_concurrency=settings.AI_CONCURRENCY_MIN,
+    max_concurrency=settings.AI_CONCURRENCY_MAX,
+    initial_concurrency=settings.AI_CONCURRENCY_INITIAL,
+    background_share=settings.AI_BACKGROUND_MAX_SHARE
+)
@@ -0,0 +1,167 @@
+"""
+AI Call Instrumentation
+Per-call-site latency / token / retry histograms and cost estimates
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Union
+
+from app.core.config import settings
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60]
+TOKEN_BUCKETS = [50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+RETRY_BUCKETS = [0, 1, 2, 3, 5]
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts, Prometheus style)"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Union[float, str, None]:
+        """
+        Upper bound of the bucket containing the q-quantile
+        "+Inf" (as in the bucket keys) past the top bucket - float inf is not valid JSON
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else "+Inf"
+        return None
+
+    def snapshot(self) -> Dict:
+        cumulative = {}
+        running = 0
+        for bound, c in zip(self.buckets, self.counts):
+            running += c
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": cumulative
+        }
+
+
+class CallSiteMetrics:
+    """Aggregates for one named call site"""
+
+    def __init__(self):
+        self.outcomes: Dict[str, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.time_to_first_token = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+        self.retries = Histogram(RETRY_BUCKETS)
+        self.cost_usd = 0.0
+
+    def snapshot(self) -> Dict:
+        return {
+            "calls": sum(self.outcomes.values()),
+            "outcomes": dict(self.outcomes),
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_seconds": self.latency.snapshot(),
+            "time_to_first_token_seconds": self.time_to_first_token.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "completion_tokens": self.completion_tokens.snapshot(),
+            "retries": self.retries.snapshot()
+        }
+
+
+_call_sites: Dict[str, CallSiteMetrics] = {}
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return (
+        prompt_tokens / 1000 * settings.OPENAI_PRICE_INPUT_PER_1K
+        + completion_tokens / 1000 * settings.OPENAI_PRICE_OUTPUT_PER_1K
+    )
+
+
+def record_ai_call(
+    call_site: str,
+    outcome: str,
+    seconds: float,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    retries: Optional[int] = None,
+    time_to_first_token: Optional[float] = None
+):
+    """
+    outcome: ok | error | cancelled | cache_hit | coalesced
+    Tokens/retries are only recorded for calls that actually went upstream
+    """
+    metrics = _call_sites.get(call_site)
+    if metrics is None:
+        metrics = _call_sites[call_site] = CallSiteMetrics()
+
+    metrics.outcomes[outcome] = metrics.outcomes.get(outcome, 0) + 1
+    metrics.latency.observe(seconds)
+
+    if time_to_first_token is not None:
+        metrics.time_to_first_token.observe(time_to_first_token)
+    if retries is not None:
+        metrics.retries.observe(retries)
+    if prompt_tokens is not None:
+        metrics.prompt_tokens.observe(prompt_tokens)
+    if completion_tokens is not None:
+        metrics.completion_tokens.observe(completion_tokens)
+    if prompt_tokens is not None or completion_tokens is not None:
+        metrics.cost_usd += estimate_cost(prompt_tokens or 0, completion_tokens or 0)
+
+
+def get_call_site_stats() -> Dict:
+    return {name: m.snapshot() for name, m in sorted(_call_sites.items())}
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition of the per-call-site histograms"""
+    lines = []
+
+    def histogram_lines(metric: str, help_text: str, attr: str):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for site, m in sorted(_call_sites.items()):
+            h: Histogram = getattr(m, attr)
+            running = 0
+            for bound, c in zip(h.buckets, h.counts):
+                running += c
+                lines.append(f'{metric}_bucket{{call_site="{site}",le="{bound}"}} {running}')
+            lines.append(f'{metric}_bucket{{call_site="{site}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{call_site="{site}"}} {h.sum}')
+            lines.append(f'{metric}_count{{call_site="{site}"}} {h.count}')
+
+    histogram_lines("ai_call_latency_seconds", "Wall time of AI calls per call site", "latency")
+    histogram_lines("ai_call_time_to_first_token_seconds", "Time to first streamed token", "time_to_first_token")
+    histogram_lines("ai_call_prompt_tokens", "Prompt tokens per upstream call", "prompt_tokens")
+    histogram_lines("ai_call_completion_tokens", "Completion tokens per upstream call", "completion_tokens")
+    histogram_lines("ai_call_retries", "Retries per upstream call", "retries")
+
+    lines.append("# HELP ai_calls_total AI calls per call site and outcome")
+    lines.append("# TYPE ai_calls_total counter")
+    for site, m in sorted(_call_sites.items()):
+        for outcome, n in sorted(m.outcomes.items()):
+            lines.append(f'ai_calls_total{{call_site="{site}",outcome="{outcome}"}} {n}')
+
+    lines.append("# HELP ai_cost_usd_total Estimated OpenAI spend per call site")
+    lines.append("# TYPE ai_cost_usd_total counter")
+    for site, m in sorted(_call_sites.items()):
+        lines.append(f'ai_cost_usd_total{{call_site="{site}"}} {m.cost_usd}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,270 @@
+"""
+AI Call Resilience
+- Retries with exponential full-jitter backoff for transient OpenAI errors
+- Optional hedged requests for latency-critical calls
+- Circuit breaker so callers fall back immediately during an outage
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Transient errors: throttling, 5xx, timeouts and dropped connections"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+
+    name = type(error).__name__.lower()
+    return "timeout" in name or "connection" in name
+
+
+def is_timeout_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 408 or "timeout" in type(error).__name__.lower()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Honour the server's Retry-After header when present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(retry_number: int) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^n)]"""
+    ceiling = min(settings.AI_RETRY_MAX_DELAY, settings.AI_RETRY_BASE_DELAY * (2 ** retry_number))
+    return random.uniform(0, ceiling)
+
+
+class LatencyTracker:
+    """Rolling window of recent upstream latencies, per call site"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, key: str, seconds: float):
+        samples = self._samples.setdefault(key, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < settings.AI_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(pct * len(ordered)))
+        return ordered[index]
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """Deadline after which a hedge fires; None until enough samples exist"""
+        p = self.percentile(key, settings.AI_HEDGE_PERCENTILE)
+        if p is None:
+            return None
+        return max(settings.AI_HEDGE_MIN_DELAY, p)
+
+
+latency_tracker = LatencyTracker()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    closed    - calls flow; consecutive transient failures are counted
+    open      - calls fail fast with CircuitOpenError until the cooldown ends
+    half_open - a few probe calls go through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float, half_open_probes: int):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.stats = {"opened": 0, "short_circuited": 0, "probes": 0}
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.recovery_seconds
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_seconds:
+                self.stats["short_circuited"] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+            print("🟡 OpenAI circuit half-open - probing")
+
+        if self.state == self.HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                self.stats["short_circuited"] += 1
+                return False
+            self.probes_in_flight += 1
+            self.stats["probes"] += 1
+
+        return True
+
+    def _release_probe(self):
+        if self.state == self.HALF_OPEN and self.probes_in_flight > 0:
+            self.probes_in_flight -= 1
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            print("🟢 OpenAI circuit closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probes_in_flight = 0
+
+    def record_failure(self):
+        self._release_probe()
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats["opened"] += 1
+                print(f"🔴 OpenAI circuit open for {self.recovery_seconds}s "
+                      f"({self.consecutive_failures} consecutive failures)")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_neutral(self):
+        """Non-transient errors (e.g. 400) say nothing about upstream health"""
+        self._release_probe()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["state"] = self.HALF_OPEN if self.state == self.OPEN and not self.is_open else self.state
+        stats["consecutive_failures"] = self.consecutive_failures
+        return stats
+
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.AI_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_seconds=settings.AI_CIRCUIT_RECOVERY_SECONDS,
+    half_open_probes=settings.AI_CIRCUIT_HALF_OPEN_PROBES
+)
+
+
+async def call_with_breaker(fn: Callable[[], Awaitable]):
+    """Fail fast while the circuit is open; feed call outcomes back to it"""
+    if not circuit_breaker.allow_request():
+        raise CircuitOpenError("OpenAI circuit open - using fallback")
+
+    try:
+        result = await fn()
+    except asyncio.CancelledError:
+        circuit_breaker.record_neutral()
+        raise
+    except Exception as e:
+        if is_retryable_error(e):
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_neutral()
+        raise
+
+    circuit_breaker.record_success()
+    return result
+
+resilience_stats = {
+    "retries": 0,
+    "retry_exhausted": 0,
+    "hedges_fired": 0,
+    "hedge_wins": 0
+}
+
+
+async def call_with_retry(
+    fn: Callable[[], Awaitable],
+    max_retries: Optional[int] = None,
+    retry_timeouts: bool = True
+) -> Tuple[object, int]:
+    """
+    Run fn, retrying transient failures with jittered backoff
+    retry_timeouts=False gives up on the first timeout (long background calls)
+
+    Returns:
+        (result, number of retries used)
+    """
+    if max_retries is None:
+        max_retries = settings.AI_MAX_RETRIES
+
+    retries = 0
+    while True:
+        try:
+            return await fn(), retries
+        except Exception as e:
+            # No point backing off into an outage other calls have already detected
+            retryable = is_retryable_error(e) and (retry_timeouts or not is_timeout_error(e))
+            if not retryable or retries >= max_retries or circuit_breaker.is_open:
+                if retries >= max_retries and retryable:
+                    resilience_stats["retry_exhausted"] += 1
+                raise
+
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = backoff_delay(retries)
+            delay = min(delay, settings.AI_RETRY_MAX_DELAY)
+
+            retries += 1
+            resilience_stats["retries"] += 1
+            print(f"⚠️  OpenAI transient error ({e}); retry {retries}/{max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+async def call_hedged(fn: Callable[[], Awaitable], delay: Optional[float]):
+    """
+    Start fn; if it has not finished after `delay` seconds start a second
+    copy and return whichever succeeds first. Only slow calls (past the
+    p95 deadline) pay for a second request.
+    """
+    if delay is None:
+        return await fn()
+
+    primary = asyncio.ensure_future(fn())
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.ensure_future(fn())
+        tasks.add(hedge)
+        resilience_stats["hedges_fired"] += 1
+
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        resilience_stats["hedge_wins"] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
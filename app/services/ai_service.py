@@ -2,61 +2,374 @@
 OpenAI Chat & Vision Service
 """
 
-from typing import List, Dict
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.ai_cache import response_cache, match_decision_cache, make_cache_key
+from app.services.ai_governor import (
+    governor,
+    estimate_request_tokens,
+    LANE_INTERACTIVE,
+    LANE_BACKGROUND
+)
+from app.services.ai_resilience import (
+    call_with_retry,
+    call_with_breaker,
+    call_hedged,
+    circuit_breaker,
+    latency_tracker,
+    resilience_stats
+)
+from app.services.ai_metrics import record_ai_call, get_call_site_stats
+
+# Retries are handled by call_with_retry so they are jittered and counted once
+# Background calls (OCR, question banks) override the timeout per request
+# OPENAI_BASE_URL points the client at loadtest/fake_openai_server.py for offline runs
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL or None,
+    timeout=settings.OPENAI_TIMEOUT,
+    max_retries=0
+)
+
+
+class CompletionResult:
+    """Content of one upstream completion plus what it cost"""
+
+    def __init__(self, content: str, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.retries = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests
+    The first caller starts the upstream call; callers with the same
+    fingerprint that arrive while it is in flight await the same result
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "cancelled": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Returns (result, shared) - shared is True for coalesced followers"""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # shield: one caller being cancelled must not cancel the shared call
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            # ...but once every caller is gone nobody wants the result
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+                self.stats["cancelled"] += 1
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def get_stats(self) -> Dict:
+        total = self.stats["leaders"] + self.stats["coalesced"]
+        stats = dict(self.stats)
+        stats["in_flight"] = len(self._inflight)
+        stats["coalesced_ratio"] = round(self.stats["coalesced"] / total, 4) if total else 0.0
+        return stats
+
+
+single_flight = SingleFlight()
+
+
+async def _run_deduplicated(key: str, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+    if not settings.AI_SINGLE_FLIGHT_ENABLED:
+        return await fn(), False
+    return await single_flight.do(key, fn)
+
+
+def _request_timeout(priority: str) -> float:
+    if priority == LANE_BACKGROUND:
+        return settings.OPENAI_BACKGROUND_TIMEOUT
+    return settings.OPENAI_TIMEOUT
+
+
+async def _completion_attempt(
+    model: str,
+    api_messages: List[Dict],
+    temperature: float,
+    max_tokens: int,
+    priority: str,
+    call_site: str
+) -> CompletionResult:
+    """One upstream request, admitted by the governor"""
+    estimated_tokens = estimate_request_tokens(api_messages, max_tokens)
+    async with governor.slot(priority, estimated_tokens) as lease:
+        started = time.monotonic()
+        response = await client.chat.completions.create(
+            model=model,
+            messages=api_messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=_request_timeout(priority)
+        )
+        # Hedge deadlines come from interactive latencies of the same call site
+        if priority == LANE_INTERACTIVE:
+            latency_tracker.record(call_site, time.monotonic() - started)
+
+        result = CompletionResult(response.choices[0].message.content.strip())
+        if response.usage:
+            lease.used_tokens = response.usage.total_tokens
+            result.prompt_tokens = response.usage.prompt_tokens
+            result.completion_tokens = response.usage.completion_tokens
+    return result
+
+
+async def _chat_completion(
+    model: str,
+    api_messages: List[Dict],
+    temperature: float,
+    max_tokens: int,
+    priority: str,
+    call_site: str,
+    hedge: bool = False
+) -> CompletionResult:
+    """
+    Upstream completion with retries and (optionally) a p95 hedge
+    Background calls are not retried after a timeout - they already had the long one
+    Raises CircuitOpenError immediately while OpenAI is known to be down
+    """
+    def attempt():
+        return _completion_attempt(model, api_messages, temperature, max_tokens, priority, call_site)
+
+    if hedge and settings.AI_HEDGE_ENABLED:
+        run = lambda: call_hedged(attempt, latency_tracker.hedge_delay(call_site))
+    else:
+        run = attempt
+
+    result, retries = await call_with_breaker(
+        lambda: call_with_retry(run, retry_timeouts=priority != LANE_BACKGROUND)
+    )
+    result.retries = retries
+    return result
+
+
+def _record(call_site: str, started: float, result: Optional[CompletionResult], shared: bool):
+    if shared:
+        # Tokens/retries were already recorded by the leader
+        record_ai_call(call_site, "coalesced", time.monotonic() - started)
+        return
+    record_ai_call(
+        call_site,
+        "ok",
+        time.monotonic() - started,
+        prompt_tokens=result.prompt_tokens,
+        completion_tokens=result.completion_tokens,
+        retries=result.retries
+    )
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
 async def call_openai_chat(
     messages: List[Dict],
     system_prompt: str = None,
     temperature: float = 0.9,
-    max_tokens: int = 500
+    max_tokens: int = 500,
+    cache_ttl: int = 0,
+    priority: str = LANE_INTERACTIVE,
+    hedge: Optional[bool] = None,
+    call_site: str = "unknown"
 ) -> str:
+    """
+    cache_ttl > 0 serves identical requests (model, system prompt, messages,
+    temperature, max_tokens) from the response cache for that many seconds
+    priority picks the governor lane: interactive (chat turns) or background
+    hedge fires a backup request past the p95 deadline (default: interactive calls)
+    call_site names the caller in the per-call-site metrics
+    """
+    started = time.monotonic()
+    if hedge is None:
+        hedge = priority == LANE_INTERACTIVE
+
+    fingerprint = make_cache_key(
+        settings.OPENAI_MODEL, system_prompt, messages, temperature, max_tokens
+    )
+
+    use_cache = cache_ttl > 0 and settings.AI_CACHE_ENABLED
+    if use_cache:
+        cached = await response_cache.get(fingerprint)
+        if cached is not None:
+            record_ai_call(call_site, "cache_hit", time.monotonic() - started)
+            return cached
+
     try:
         api_messages = []
         if system_prompt:
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend(messages)
-        
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=api_messages,
-            temperature=temperature,
-            max_tokens=max_tokens
+
+        result, shared = await _run_deduplicated(
+            fingerprint,
+            lambda: _chat_completion(
+                settings.OPENAI_MODEL, api_messages, temperature, max_tokens, priority, call_site, hedge
+            )
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
-        print(f"❌ OpenAI Chat failed: {e}")
+        record_ai_call(call_site, "error", time.monotonic() - started)
+        print(f"❌ OpenAI Chat failed [{call_site}]: {e}")
         raise Exception(f"AI error: {str(e)}")
 
+    _record(call_site, started, result, shared)
+    if use_cache:
+        await response_cache.set(fingerprint, result.content, cache_ttl)
+    return result.content
+
+async def _next_chunk(iterator, deadline: float):
+    """Next chunk of an upstream stream (None at the end); asyncio.TimeoutError past the deadline"""
+    remaining = deadline - time.monotonic()
+    try:
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        return await asyncio.wait_for(iterator.__anext__(), remaining)
+    except StopAsyncIteration:
+        return None
+    except asyncio.TimeoutError:
+        raise asyncio.TimeoutError(f"stream exceeded OPENAI_TIMEOUT ({settings.OPENAI_TIMEOUT}s)")
+
+
+async def stream_openai_chat(
+    messages: List[Dict],
+    system_prompt: str = None,
+    temperature: float = 0.9,
+    max_tokens: int = 500,
+    call_site: str = "unknown"
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of call_openai_chat - yields content deltas as they arrive
+    Not cached or coalesced: every caller gets its own stream
+    The whole stream must finish within OPENAI_TIMEOUT
+    """
+    started = time.monotonic()
+    first_token_at = None
+    retries = 0
+
+    api_messages = []
+    if system_prompt:
+        api_messages.append({"role": "system", "content": system_prompt})
+    api_messages.extend({"role": m["role"], "content": m["content"]} for m in messages)
+
+    estimated_tokens = estimate_request_tokens(api_messages, max_tokens)
+    try:
+        async with governor.slot(LANE_INTERACTIVE, estimated_tokens):
+            deadline = time.monotonic() + settings.OPENAI_TIMEOUT
+            # Retry only opening the stream - once deltas flow, a retry would duplicate text
+            stream, retries = await call_with_breaker(lambda: call_with_retry(
+                lambda: client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=api_messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    timeout=settings.OPENAI_TIMEOUT
+                )
+            ))
+            iterator = stream.__aiter__()
+            try:
+                while True:
+                    chunk = await _next_chunk(iterator, deadline)
+                    if chunk is None:
+                        break
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        yield delta
+            finally:
+                # Timed out or abandoned: drop the upstream connection
+                await stream.response.aclose()
+    except (asyncio.CancelledError, GeneratorExit):
+        # The consumer went away (client disconnect) - not an upstream failure
+        record_ai_call(call_site, "cancelled", time.monotonic() - started, retries=retries)
+        raise
+    except Exception as e:
+        record_ai_call(call_site, "error", time.monotonic() - started, retries=retries)
+        print(f"❌ OpenAI Chat stream failed [{call_site}]: {e}")
+        raise Exception(f"AI error: {str(e)}")
+
+    # The streaming API does not report usage; prompt tokens are estimated
+    record_ai_call(
+        call_site,
+        "ok",
+        time.monotonic() - started,
+        prompt_tokens=estimated_tokens - max_tokens,
+        retries=retries,
+        time_to_first_token=(first_token_at - started) if first_token_at else None
+    )
+
 async def call_openai_with_image(
     text_prompt: str,
     base64_image: str,
     temperature: float = 0.1,
-    max_tokens: int = 2000
+    max_tokens: int = 2000,
+    priority: str = LANE_BACKGROUND,
+    call_site: str = "unknown"
 ) -> str:
+    started = time.monotonic()
+    api_messages = [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": text_prompt},
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/png;base64,{base64_image}"
+                }
+            }
+        ]
+    }]
+    fingerprint = hashlib.sha256(
+        f"{settings.OPENAI_VISION_MODEL}|{temperature}|{max_tokens}|{text_prompt}|{base64_image}".encode("utf-8")
+    ).hexdigest()
+
     try:
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_VISION_MODEL,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": text_prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}"
-                        }
-                    }
-                ]
-            }],
-            temperature=temperature,
-            max_tokens=max_tokens
+        result, shared = await _run_deduplicated(
+            fingerprint,
+            lambda: _chat_completion(
+                settings.OPENAI_VISION_MODEL, api_messages, temperature, max_tokens, priority, call_site
+            )
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
-        print(f"❌ Vision API failed: {e}")
+        record_ai_call(call_site, "error", time.monotonic() - started)
+        print(f"❌ Vision API failed [{call_site}]: {e}")
         raise Exception(f"Vision error: {str(e)}")
 
+    _record(call_site, started, result, shared)
+    return result.content
+
+
+def get_ai_stats() -> Dict:
+    """Runtime counters for the AI layer"""
+    return {
+        "cache": response_cache.get_stats(),
+        "match_decision_cache": match_decision_cache.get_stats(),
+        "single_flight": single_flight.get_stats(),
+        "governor": governor.get_stats(),
+        "resilience": dict(resilience_stats),
+        "circuit_breaker": circuit_breaker.get_stats(),
+        "call_sites": get_call_site_stats()
+    }
@@ -2,9 +2,10 @@
 Answer Validation Service
 ✅ IMPROVED: Hybrid validation (Rules + AI)
 """
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 from datetime import datetime
 import re
+from app.core.config import settings
 from app.services.ai_service import call_openai_chat
 
 
@@ -15,17 +16,29 @@ async def validate_answer(field: Dict, answer: str) -> Tuple[bool, str]:
     Returns:
         Tuple[bool, str]: (is_valid, feedback_message)
     """
+    # ✅ RULE-BASED VALIDATION runs BEFORE AI validation for accuracy
+    result = validate_with_rules(field, answer)
+    if result is not None:
+        return result
+    
+    # ✅ For other fields, use AI validation
+    return await validate_with_ai(field, answer)
+
+
+def validate_with_rules(field: Dict, answer: str) -> Optional[Tuple[bool, str]]:
+    """
+    Rule-based checks only (no LLM call)
+    
+    Returns:
+        (is_valid, feedback_message), or None if no rule covers this field
+    """
     label = field.get("label", "")
     field_type = field.get("type", "text")
-    description = field.get("description", "")
     
     # ✅ Quick validation: Check if answer is not empty
     if not answer or len(answer.strip()) < 2:
         return False, f"Please provide a valid {label}. The answer seems too short."
     
-    # ✅ RULE-BASED VALIDATION for specific field types
-    # This runs BEFORE AI validation for accuracy
-    
     # DATE fields - use rule-based validation
     if field_type.lower() == "date" or any(word in label.lower() for word in ["date", "birth", "issue", "expiry"]):
         return validate_date_field(answer, label)
@@ -42,8 +55,7 @@ async def validate_answer(field: Dict, answer: str) -> Tuple[bool, str]:
     if field_type.lower() == "number":
         return validate_number_field(answer, label)
     
-    # ✅ For other fields, use AI validation
-    return await validate_with_ai(field, answer)
+    return None
 
 
 # ========== RULE-BASED VALIDATORS ==========
@@ -216,7 +228,9 @@ Be lenient - accept reasonable answers."""
             messages=[{"role": "user", "content": prompt}],
             system_prompt="You are a form validator. Be helpful but not overly strict. Return only JSON.",
             temperature=0.3,
-            max_tokens=200
+            max_tokens=200,
+            cache_ttl=settings.VALIDATION_CACHE_TTL,
+            call_site="answer_validation"
         )
         
         # Parse JSON response
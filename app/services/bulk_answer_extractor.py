@@ -0,0 +1,117 @@
+"""
+Multi-Field Answer Extraction
+✅ Fills many fields from one message (e.g. pasted passport details)
+✅ One LLM call maps the message onto the unanswered fields; each value is
+   checked with the rule validators from answer_validator
+"""
+
+import json
+import re
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.services.ai_service import call_openai_chat
+from app.services.answer_validator import validate_with_rules
+
+
+# "Label: value" pairs ("Name: John", "Date of birth: 1990-01-01")
+LABELLED_VALUE = re.compile(r"[A-Za-z][\w .'/()-]{0,40}:\s*\S")
+
+
+def looks_like_bulk_answer(message: str) -> bool:
+    """
+    Cheap pre-check: the message must carry several field-like parts -
+    two "label: value" pairs, several lines / ";"-separated parts, or (when
+    long) three or more comma-separated values. Length alone is not enough
+    """
+    if not settings.BULK_EXTRACTION_ENABLED:
+        return False
+    text = message.strip()
+    if len(LABELLED_VALUE.findall(text)) >= 2:
+        return True
+    parts = [p for p in text.replace(";", "\n").split("\n") if p.strip()]
+    if len(parts) >= 2:
+        return True
+    values = [v for v in text.split(",") if v.strip()]
+    return len(text) >= settings.BULK_EXTRACTION_MIN_CHARS and len(values) >= 3
+
+
+async def extract_multiple_answers(
+    message: str,
+    fields: List[Dict],
+    answers: Dict,
+    start_index: int = 0
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Map a free-text message onto unanswered fields (from start_index on)
+
+    Returns:
+        (accepted {field_id: value}, rejected {field_id: feedback_message})
+    """
+    candidates = [
+        f for f in fields[start_index:]
+        if f.get("id") not in answers
+    ][:settings.BULK_EXTRACTION_MAX_FIELDS]
+    if not candidates:
+        return {}, {}
+
+    fields_json = json.dumps(
+        [{"id": f.get("id"), "label": f.get("label", ""), "type": f.get("type", "text")} for f in candidates],
+        indent=2
+    )
+
+    prompt = f"""Extract visa form answers from the user's message.
+
+USER'S MESSAGE:
+"{message}"
+
+UNANSWERED FORM FIELDS:
+{fields_json}
+
+RULES:
+- Only fill a field if the message clearly states its value
+- Copy values as written (dates as given, names with original spelling)
+- Never guess or infer values that are not in the message
+- Leave out fields the message does not answer
+
+Return JSON ONLY:
+{{
+  "answers": {{
+    "<field id>": "value"
+  }}
+}}"""
+
+    try:
+        response = await call_openai_chat(
+            messages=[{"role": "user", "content": prompt}],
+            system_prompt="You extract form answers precisely. Return only JSON.",
+            temperature=0.0,
+            max_tokens=40 * len(candidates) + 100,
+            call_site="bulk_answer_extraction"
+        )
+
+        if "```json" in response:
+            response = response.split("```json")[1].split("```")[0].strip()
+        elif "```" in response:
+            response = response.split("```")[1].split("```")[0].strip()
+
+        extracted = json.loads(response).get("answers", {})
+
+    except Exception as e:
+        print(f"⚠️  Bulk extraction failed: {e}")
+        return {}, {}
+
+    by_id = {str(f.get("id")): f for f in candidates}
+    accepted, rejected = {}, {}
+    for field_id, value in extracted.items():
+        field = by_id.get(str(field_id))
+        if not field or not isinstance(value, str) or not value.strip():
+            continue
+        result = validate_with_rules(field, value.strip())
+        if result is None or result[0]:
+            accepted[field["id"]] = value.strip()
+        else:
+            rejected[field["id"]] = result[1]
+
+    print(f"📋 Bulk extraction: {len(accepted)} accepted, {len(rejected)} rejected")
+    return accepted, rejected
@@ -3,47 +3,57 @@ Conversation State Management
 ✅ UPDATED: Added update_specific_answer for smart corrections
 """
 
-from typing import Tuple, Dict
-from app.core.storage import load_conversation, save_conversation, get_form_by_id
+from typing import Tuple, Dict, List
 from app.core.config import settings
+from app.core.session_context import SessionContext
+from app.services.conversation_summary import clear_summary
+from app.services.form_matcher import clear_topic_state
+
+
+def _next_unanswered_index(fields: List[Dict], answers: Dict, start: int) -> int:
+    """First field at or after `start` without an answer (fields can be filled ahead in bulk)"""
+    idx = start
+    while idx < len(fields) and fields[idx].get("id") in answers:
+        idx += 1
+    return idx
 
 
 class ConversationManager:
     """
     Manages conversation state transitions and form filling progress
+    All methods work on the request's SessionContext; the caller flushes it
     """
     
     @staticmethod
-    async def transition_to_form_matched(session_id: str, form_id: str):
+    async def transition_to_form_matched(ctx: SessionContext, form_id: str):
         """Transition to form matched state"""
-        data = await load_conversation(session_id)
+        data = ctx.data
         data["state"] = settings.STATE_FORM_MATCHED
         data["matched_form_id"] = form_id
         data["current_field_index"] = 0
         data["answers"] = {}
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
     
     @staticmethod
-    async def transition_to_filling_form(session_id: str):
+    async def transition_to_filling_form(ctx: SessionContext):
         """Transition to filling form state"""
-        data = await load_conversation(session_id)
+        data = ctx.data
         data["state"] = settings.STATE_FILLING_FORM
         data["current_field_index"] = 0
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
     
     @staticmethod
-    async def transition_to_completed(session_id: str):
+    async def transition_to_completed(ctx: SessionContext):
         """Transition to completed state"""
-        data = await load_conversation(session_id)
+        data = ctx.data
         data["state"] = settings.STATE_COMPLETED
-        await save_conversation(session_id, data)
+        ctx.mark_dirty()
     
     @staticmethod
-    async def get_current_field(session_id: str) -> Tuple[Dict, int, int]:
+    async def get_current_field(ctx: SessionContext) -> Tuple[Dict, int, int]:
         """Get the current field user needs to fill"""
-        data = await load_conversation(session_id)
-        form_id = data.get("matched_form_id")
-        form = await get_form_by_id(form_id)
+        data = ctx.data
+        form = await ctx.get_form()
         
         if not form:
             raise Exception("Form not found")
@@ -57,16 +67,15 @@ class ConversationManager:
         return fields[idx], idx, len(fields)
     
     @staticmethod
-    async def save_answer(session_id: str, answer: str) -> bool:
+    async def save_answer(ctx: SessionContext, answer: str) -> bool:
         """
         Save user's answer for current field and move to next
         
         Returns:
             bool: True if more fields remain, False if form is complete
         """
-        data = await load_conversation(session_id)
-        form_id = data.get("matched_form_id")
-        form = await get_form_by_id(form_id)
+        data = ctx.data
+        form = await ctx.get_form()
         
         if not form:
             return False
@@ -90,21 +99,56 @@ class ConversationManager:
             "field_type": field.get("type", "text")
         }
         
-        # Move to next field
-        data["current_field_index"] = idx + 1
-        await save_conversation(session_id, data)
+        # Move to next field (skipping fields already filled in bulk)
+        next_idx = _next_unanswered_index(fields, data["answers"], idx + 1)
+        data["current_field_index"] = next_idx
+        ctx.mark_dirty()
         
         # Return whether more fields remain
-        return idx + 1 < len(fields)
+        return next_idx < len(fields)
+    
+    @staticmethod
+    async def save_answers(ctx: SessionContext, values: Dict[str, str]) -> bool:
+        """
+        Save answers for several fields at once (bulk extraction) and move
+        to the first field that is still unanswered
+        
+        Returns:
+            bool: True if more fields remain, False if form is complete
+        """
+        data = ctx.data
+        form = await ctx.get_form()
+        
+        if not form:
+            return False
+        
+        fields = form.get("fields", [])
+        
+        if "answers" not in data:
+            data["answers"] = {}
+        
+        for field in fields:
+            if field["id"] in values:
+                data["answers"][field["id"]] = {
+                    "label": field["label"],
+                    "answer": values[field["id"]],
+                    "field_type": field.get("type", "text")
+                }
+        
+        next_idx = _next_unanswered_index(fields, data["answers"], data.get("current_field_index", 0))
+        data["current_field_index"] = next_idx
+        ctx.mark_dirty()
+        
+        return next_idx < len(fields)
     
     @staticmethod
-    async def update_specific_answer(session_id: str, field_id: str, new_answer: str) -> bool:
+    async def update_specific_answer(ctx: SessionContext, field_id: str, new_answer: str) -> bool:
         """
         ✅ NEW: Update a specific field's answer without changing current position
         This allows users to correct previous answers naturally
         
         Args:
-            session_id: User session ID
+            ctx: Request session context
             field_id: ID of the field to update
             new_answer: New answer value
         
@@ -112,9 +156,8 @@ class ConversationManager:
             bool: True if update successful, False otherwise
         """
         try:
-            data = await load_conversation(session_id)
-            form_id = data.get("matched_form_id")
-            form = await get_form_by_id(form_id)
+            data = ctx.data
+            form = await ctx.get_form()
             
             if not form:
                 return False
@@ -142,7 +185,7 @@ class ConversationManager:
             }
             
             # Save without changing current_field_index
-            await save_conversation(session_id, data)
+            ctx.mark_dirty()
             
             print(f"✅ Updated answer for field: {target_field['label']}")
             print(f"   New answer: {new_answer}")
@@ -154,18 +197,18 @@ class ConversationManager:
             return False
     
     @staticmethod
-    async def get_answer_history(session_id: str) -> Dict:
+    async def get_answer_history(ctx: SessionContext) -> Dict:
         """
         Get all answered fields with their values
         Useful for showing user what they've filled so far
         """
-        data = await load_conversation(session_id)
+        data = ctx.data
         form_id = data.get("matched_form_id")
         
         if not form_id:
             return {}
         
-        form = await get_form_by_id(form_id)
+        form = await ctx.get_form(form_id)
         if not form:
             return {}
         
@@ -187,9 +230,9 @@ class ConversationManager:
         return history
     
     @staticmethod
-    async def get_progress(session_id: str) -> Dict:
+    async def get_progress(ctx: SessionContext) -> Dict:
         """Get form filling progress"""
-        data = await load_conversation(session_id)
+        data = ctx.data
         form_id = data.get("matched_form_id")
         
         if not form_id:
@@ -200,7 +243,7 @@ class ConversationManager:
                 "answers_count": 0
             }
         
-        form = await get_form_by_id(form_id)
+        form = await ctx.get_form(form_id)
         
         if not form:
             return {
@@ -225,12 +268,14 @@ class ConversationManager:
         }
     
     @staticmethod
-    async def reset_session(session_id: str):
+    async def reset_session(ctx: SessionContext):
         """Reset session to initial state"""
-        data = await load_conversation(session_id)
+        data = ctx.data
         data["state"] = settings.STATE_CHATTING
         data["matched_form_id"] = None
         data["current_field_index"] = 0
         data["answers"] = {}
         data["history"] = []
-        await save_conversation(session_id, data)
\ No newline at end of file
+        clear_summary(data)
+        clear_topic_state(data)
+        ctx.mark_dirty()
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Rolling Conversation Summary
+Keeps a compact running summary on the conversation document
+(data["summary"], covering history[:data["summary_upto"]]) so prompts can send
+summary + a short tail of recent messages instead of the whole history.
+The summary is only refreshed once SUMMARY_REFRESH_EVERY new messages have
+accumulated beyond the verbatim tail.
+"""
+
+from typing import Dict, List
+
+from app.core.config import settings
+from app.services.ai_service import call_openai_chat
+from app.services.token_budget import fit_history, fit_user_text
+
+
+def clear_summary(data: dict):
+    """Call wherever the history is reset"""
+    data["summary"] = ""
+    data["summary_upto"] = 0
+
+
+def _summary_upto(data: dict, history: List[Dict]) -> int:
+    upto = data.get("summary_upto", 0)
+    if upto > len(history):
+        # History was truncated without clear_summary - the summary is stale
+        clear_summary(data)
+        return 0
+    return upto
+
+
+async def refresh_summary(data: dict, history: List[Dict]) -> bool:
+    """
+    Fold messages that fell out of the recent tail into data["summary"]
+    Returns True when the summary was updated
+    """
+    if not settings.CONVERSATION_SUMMARY_ENABLED:
+        return False
+
+    upto = _summary_upto(data, history)
+    fold_until = len(history) - settings.SUMMARY_KEEP_RECENT
+    if fold_until - upto < settings.SUMMARY_REFRESH_EVERY:
+        return False
+
+    new_messages = history[upto:fold_until]
+    transcript = "\n".join(
+        f"{m['role'].upper()}: {m.get('content', '')}" for m in fit_history(new_messages)
+    )
+    previous = data.get("summary") or "(none yet)"
+
+    prompt = f"""Update the running summary of this visa consultation.
+
+CURRENT SUMMARY:
+{previous}
+
+NEW MESSAGES:
+{transcript}
+
+Write the updated summary in 2-5 short sentences. Keep every concrete fact the
+user gave (destination country, purpose, visa type, duration, dates, family,
+prior travel, concerns). Drop greetings and small talk.
+Return ONLY the summary text:"""
+
+    try:
+        summary = await call_openai_chat(
+            messages=[{"role": "user", "content": prompt}],
+            system_prompt="You summarize visa consultations concisely and factually.",
+            temperature=0.2,
+            max_tokens=settings.SUMMARY_MAX_TOKENS,
+            call_site="conversation_summary"
+        )
+    except Exception as e:
+        # Keep the old summary; the tail just grows until the next attempt
+        print(f"⚠️  Summary refresh failed: {e}")
+        return False
+
+    data["summary"] = summary
+    data["summary_upto"] = fold_until
+    print(f"📝 Conversation summary updated (covers {fold_until}/{len(history)} messages)")
+    return True
+
+
+async def build_conversation_context(data: dict, history: List[Dict]) -> List[Dict]:
+    """Summary (as a system message) + the messages it does not cover yet"""
+    await refresh_summary(data, history)
+
+    upto = _summary_upto(data, history)
+    context = fit_history(history[upto:])
+    if data.get("summary"):
+        context.insert(0, {
+            "role": "system",
+            "content": f"Summary of the conversation so far: {data['summary']}"
+        })
+    return context
+
+
+def build_matching_text(data: dict, history: List[Dict], budget: int) -> str:
+    """Summary + the user's messages since, for the matching prompts"""
+    upto = _summary_upto(data, history)
+    tail = fit_user_text(history[upto:], budget)
+    if data.get("summary"):
+        return f"{data['summary']} {tail}".strip()
+    return tail
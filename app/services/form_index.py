@@ -0,0 +1,184 @@
+"""
+Lexical Form Index (BM25)
+In-memory inverted index over each form's title, visa_type, country and
+purpose_keywords. Form matching asks it for the top-k forms for the
+conversation and only sends that shortlist to the LLM, so the matching prompt
+stays the same size however large the catalog grows.
+Updated incrementally: upload/delete call add/remove, and sync() reconciles
+with the catalog (forms written or re-saved by other workers, detected by
+updated_at) before every search.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Field weights - a country or visa type hit says more than a title word
+FIELD_WEIGHTS = {
+    "title": 1.0,
+    "visa_type": 2.0,
+    "country": 3.0,
+    "purpose_keywords": 1.5,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "for", "from", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "the", "to", "want", "with", "visa", "form"
+}
+
+# Common abbreviations, so "usa" finds forms whose country is "United States"
+QUERY_ALIASES = {
+    "usa": ["united", "states", "us", "usa", "america"],
+    "america": ["united", "states", "us", "usa", "america"],
+    "uk": ["united", "kingdom", "uk", "britain"],
+    "britain": ["united", "kingdom", "uk", "britain"],
+    "uae": ["united", "arab", "emirates", "uae"],
+}
+
+
+# Crude suffix stripping so "study" / "student" / "studies" and "tourism" /
+# "tourist" meet on the same term
+SUFFIXES = ("ents", "ent", "ism", "ist", "ies", "ing", "es", "s", "y")
+
+
+def _stem(token: str) -> str:
+    if token.endswith("ss"):
+        return token
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
+    return [_stem(t) for t in tokens if t not in STOPWORDS]
+
+
+def _form_terms(form: Dict) -> Counter:
+    """Weighted term frequencies for one form"""
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = form.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        for token in tokenize(str(value)):
+            terms[token] += weight
+    return terms
+
+
+class FormIndex:
+    """BM25 over the forms catalog, keyed by form_id"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._lengths: Dict[str, float] = {}
+        self._terms: Dict[str, Counter] = {}
+        self._pdf_doc_ids: Dict[str, str] = {}
+        self._versions: Dict[str, object] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, form: Dict):
+        """Index (or re-index) a form"""
+        form_id = form.get("form_id")
+        if not form_id:
+            return
+        self.remove(form_id)
+
+        terms = _form_terms(form)
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[form_id] = tf
+        length = sum(terms.values())
+        self._terms[form_id] = terms
+        self._lengths[form_id] = length
+        self._total_length += length
+        self._versions[form_id] = form.get("updated_at")
+        if form.get("pdf_doc_id"):
+            self._pdf_doc_ids[form["pdf_doc_id"]] = form_id
+
+    def remove(self, form_id: str):
+        terms = self._terms.pop(form_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(form_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(form_id, 0.0)
+        self._versions.pop(form_id, None)
+        for pdf_doc_id in [p for p, f in self._pdf_doc_ids.items() if f == form_id]:
+            del self._pdf_doc_ids[pdf_doc_id]
+
+    def remove_by_pdf_doc_id(self, pdf_doc_id: str):
+        form_id = self._pdf_doc_ids.get(pdf_doc_id)
+        if form_id:
+            self.remove(form_id)
+
+    def sync(self, forms: List[Dict]):
+        """
+        Add forms missing from the index, re-index forms whose updated_at
+        changed and drop ones no longer in the catalog
+        """
+        current = {f.get("form_id") for f in forms}
+        for form_id in [f for f in self._lengths if f not in current]:
+            self.remove(form_id)
+        added = 0
+        for form in forms:
+            form_id = form.get("form_id")
+            if form_id not in self._lengths or self._versions.get(form_id) != form.get("updated_at"):
+                self.add(form)
+                added += 1
+        if added:
+            print(f"🗂️  Form index: {added} forms (re)indexed ({len(self)} indexed)")
+
+    def search(self, text: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (form_id, score) for a free-text query, best first"""
+        if not self._lengths:
+            return []
+
+        query = Counter()
+        for token in tokenize(text):
+            for term in [_stem(t) for t in QUERY_ALIASES.get(token, [token])]:
+                query[term] += 1
+
+        n = len(self._lengths)
+        avg_length = self._total_length / n if n else 0.0
+        scores: Dict[str, float] = {}
+        for term, qtf in query.items():
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for form_id, tf in posting.items():
+                norm = 1 - BM25_B + BM25_B * (self._lengths[form_id] / avg_length if avg_length else 1)
+                scores[form_id] = scores.get(form_id, 0.0) + qtf * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+
+form_index = FormIndex()
+
+
+def shortlist_forms(conversation_text: str, forms: List[Dict], k: int) -> List[Dict]:
+    """
+    The k best lexical candidates from `forms`
+    If nothing matches at all, the first k forms are returned so the LLM
+    can still answer NO_MATCH / OFF_TOPIC style decisions
+    """
+    form_index.sync(forms)
+    ranked = form_index.search(conversation_text, k)
+    if not ranked:
+        return forms[:k]
+
+    by_id = {f.get("form_id"): f for f in forms}
+    return [by_id[form_id] for form_id, _ in ranked if form_id in by_id]
@@ -2,18 +2,84 @@
 AI-First Form Matching Service
 ✅ IMPROVED: Soft OFF_TOPIC validation with detailed prompts
 ✅ 2-Tier approach: Fast keyword check → AI verification
+✅ Deterministic fast path for unambiguous intents (see intent_extractor)
+✅ SINGLE/MULTIPLE decisions cached per intent signature + catalog version
 """
 
+import hashlib
 import json
 from typing import List, Dict, Optional
-from app.core.storage import load_forms_db
+from app.core.config import settings
+from app.core.storage import load_forms_db, get_forms_catalog_version
+from app.services.ai_cache import match_decision_cache
 from app.services.ai_service import call_openai_chat
-
-
-async def is_conversation_about_visa(conversation: List[Dict]) -> bool:
+from app.services.form_index import shortlist_forms
+from app.services.intent_extractor import (
+    extract_intent,
+    fast_match,
+    form_intent,
+    intent_signature,
+    is_ambiguous_text
+)
+from app.services.keyword_automaton import KeywordAutomaton
+from app.services.token_budget import fit_user_text
+
+
+# Tier-1 topic keywords
+VISA_KEYWORDS = [
+    # Core visa terms
+    "visa", "immigration", "passport", "embassy", "consulate",
+    
+    # Application related
+    "application", "apply", "form", "document", "file", "paper",
+    "requirement", "fill", "submit", "process",
+    
+    # Travel related
+    "travel", "visit", "trip", "journey", "abroad", "international",
+    "country", "destination",
+    
+    # Visa types
+    "student", "tourist", "tourism", "work", "business", "transit",
+    "study", "education", "employment", "schengen",
+    
+    # Common phrases
+    "going to", "planning to", "want to visit", "need to travel",
+    
+    # Countries (major ones)
+    "usa", "america", "uk", "britain", "canada", "australia",
+    "schengen", "europe", "germany", "france", "spain", "italy"
+]
+
+VISA_KEYWORD_SCANNER = KeywordAutomaton(VISA_KEYWORDS)
+
+# Early document questions without country / purpose context
+DOC_QUESTION_SCANNER = KeywordAutomaton([
+    "document", "file", "paper", "requirement", "what do i need",
+    "what should i", "what type", "which file", "what kind"
+])
+CONTEXT_KEYWORD_SCANNER = KeywordAutomaton([
+    "usa", "uk", "canada", "australia", "germany", "france",
+    "student", "tourist", "work", "visit", "study", "business",
+    "schengen", "america", "britain"
+])
+
+
+def clear_topic_state(data: dict):
+    """Call wherever the history is reset (the verdict belongs to that history)"""
+    data.pop("topic_state", None)
+
+
+async def is_conversation_about_visa(
+    conversation: List[Dict],
+    topic_state: Optional[Dict] = None
+) -> bool:
     """
     Intelligent OFF_TOPIC detection with soft validation
     Uses 2-tier approach: Fast keyword check → AI verification
+    
+    topic_state (optional, stored on the session) makes the check incremental:
+    only messages after topic_state["scanned_upto"] are scanned, and once the
+    conversation is established as visa-related ("on_topic") neither tier runs again
     """
     user_messages = [m["content"] for m in conversation if m["role"] == "user"]
     
@@ -21,8 +87,21 @@ async def is_conversation_about_visa(conversation: List[Dict]) -> bool:
     if not user_messages:
         return True
     
+    if topic_state is None:
+        topic_state = {}
+    elif topic_state.get("on_topic"):
+        print(f"\n🔍 OFF_TOPIC Check: established visa-related → {topic_state.get('keywords', [])[:3]}")
+        return True
+    
+    scanned_upto = topic_state.get("scanned_upto", 0)
+    if scanned_upto > len(conversation):
+        scanned_upto = 0  # History was truncated - rescan
+    
     recent_text = " ".join(user_messages[-3:])  # Last 3 messages for context
-    full_text = " ".join(user_messages).lower()  # All messages for keyword check
+    new_text = " ".join(  # Only messages not scanned before
+        m["content"] for m in conversation[scanned_upto:] if m["role"] == "user"
+    ).lower()
+    topic_state["scanned_upto"] = len(conversation)
     
     print(f"\n🔍 OFF_TOPIC Check Started")
     print(f"   Recent: '{recent_text[:80]}...'")
@@ -30,34 +109,12 @@ async def is_conversation_about_visa(conversation: List[Dict]) -> bool:
     # =====================================
     # TIER 1: Fast Keyword Check (No AI)
     # =====================================
-    visa_keywords = [
-        # Core visa terms
-        "visa", "immigration", "passport", "embassy", "consulate",
-        
-        # Application related
-        "application", "apply", "form", "document", "file", "paper",
-        "requirement", "fill", "submit", "process",
-        
-        # Travel related
-        "travel", "visit", "trip", "journey", "abroad", "international",
-        "country", "destination",
-        
-        # Visa types
-        "student", "tourist", "tourism", "work", "business", "transit",
-        "study", "education", "employment", "schengen",
-        
-        # Common phrases
-        "going to", "planning to", "want to visit", "need to travel",
-        
-        # Countries (major ones)
-        "usa", "america", "uk", "britain", "canada", "australia",
-        "schengen", "europe", "germany", "france", "spain", "italy"
-    ]
-    
-    matched_keywords = [kw for kw in visa_keywords if kw in full_text]
+    matched_keywords = VISA_KEYWORD_SCANNER.find_all(new_text)
     
     if matched_keywords:
         print(f"   ✅ TIER 1 PASS: Keywords found → {matched_keywords[:3]}")
+        topic_state["on_topic"] = True
+        topic_state["keywords"] = matched_keywords
         return True
     
     print(f"   ⚠️ TIER 1: No keywords - proceeding to AI check...")
@@ -155,7 +212,9 @@ Answer with ONLY "YES" or "NO" - nothing else."""
             messages=[{"role": "user", "content": ai_prompt}],
             system_prompt="You are a permissive topic classifier. When in doubt between YES/NO, choose YES to avoid blocking legitimate users. Return ONLY 'YES' or 'NO'.",
             temperature=0.1,  # Very low for consistency
-            max_tokens=10
+            max_tokens=10,
+            cache_ttl=settings.TOPIC_CACHE_TTL,
+            call_site="topic_classifier"
         )
         
         # Parse response
@@ -164,6 +223,7 @@ Answer with ONLY "YES" or "NO" - nothing else."""
         
         if is_visa_related:
             print(f"   ✅ TIER 2 PASS: AI classified as visa-related")
+            topic_state["on_topic"] = True
         else:
             print(f"   ❌ TIER 2 REJECT: AI classified as off-topic")
             print(f"   Response: {response_clean}")
@@ -177,10 +237,19 @@ Answer with ONLY "YES" or "NO" - nothing else."""
         return True
 
 
-async def match_form_from_conversation(conversation: List[Dict]) -> Optional[Dict]:
+async def match_form_from_conversation(
+    conversation: List[Dict],
+    summary: Optional[str] = None,
+    summary_upto: int = 0,
+    topic_state: Optional[Dict] = None
+) -> Optional[Dict]:
     """
     AI-driven form matching - no hardcoded rules
     
+    summary (optional) is the rolling conversation summary covering
+    conversation[:summary_upto]; the prompt then gets summary + the messages since
+    topic_state (optional) is the session's incremental topic verdict, updated in place
+    
     Returns:
         - Single form if one clear match
         - Multiple forms dict if user needs to choose
@@ -197,15 +266,10 @@ async def match_form_from_conversation(conversation: List[Dict]) -> Optional[Dic
         last_msg = user_messages[-1].lower()
         
         # Check if asking about documents/requirements
-        doc_keywords = ["document", "file", "paper", "requirement", "what do i need", 
-                       "what should i", "what type", "which file", "what kind"]
-        is_doc_question = any(kw in last_msg for kw in doc_keywords)
+        is_doc_question = DOC_QUESTION_SCANNER.contains_any(last_msg)
         
         # Check if context is missing
-        context_keywords = ["usa", "uk", "canada", "australia", "germany", "france",
-                          "student", "tourist", "work", "visit", "study", "business",
-                          "schengen", "america", "britain"]
-        has_context = any(kw in " ".join(user_messages).lower() for kw in context_keywords)
+        has_context = any(CONTEXT_KEYWORD_SCANNER.contains_any(m.lower()) for m in user_messages)
         
         if is_doc_question and not has_context:
             print(f"Early document question without context - asking for clarification")
@@ -217,9 +281,29 @@ async def match_form_from_conversation(conversation: List[Dict]) -> Optional[Dic
             }
     
     # =====================================
-    # Step 1: Check if conversation is about visa/immigration
+    # Step 1: Extract conversation context
+    # =====================================
+    if summary and summary_upto <= len(conversation):
+        tail_text = fit_user_text(conversation[summary_upto:], settings.MATCHING_CONTEXT_TOKEN_BUDGET)
+        conversation_text = f"{summary} {tail_text}".strip()
+    else:
+        conversation_text = fit_user_text(conversation, settings.MATCHING_CONTEXT_TOKEN_BUDGET)
+    
+    # =====================================
+    # Step 2: Deterministic fast path (no AI)
+    # One country + one purpose that map to exactly one form
     # =====================================
-    is_visa_related = await is_conversation_about_visa(conversation)
+    if settings.INTENT_FAST_PATH_ENABLED:
+        forms = await load_forms_db()
+        fast = fast_match(conversation_text, forms)
+        if fast:
+            print(f"⚡ Fast-path match → {fast['title']}")
+            return fast
+    
+    # =====================================
+    # Step 3: Check if conversation is about visa/immigration
+    # =====================================
+    is_visa_related = await is_conversation_about_visa(conversation, topic_state)
     
     if not is_visa_related:
         return {
@@ -229,24 +313,34 @@ async def match_form_from_conversation(conversation: List[Dict]) -> Optional[Dic
         }
     
     # =====================================
-    # Step 2: Load available forms
+    # Step 4: Load available forms
     # =====================================
     forms = await load_forms_db()
     
     if not forms:
         return None
     
-    # =====================================
-    # Step 3: Extract conversation context
-    # =====================================
-    conversation_text = " ".join(user_messages)
-    
     print(f"\nForm Matching Started")
     print(f"   Analyzing: {conversation_text[:100]}...")
     print(f"   Available forms: {len(forms)}")
     
+    # Sessions with the same intent reuse the decision made for this catalog
+    decision_cache_key = None
+    signature = cacheable_signature(conversation_text)
+    if signature:
+        decision_cache_key = match_decision_cache_key(signature, await get_forms_catalog_version())
+        cached = await get_cached_match_decision(decision_cache_key, forms)
+        if cached:
+            print(f"   ⚡ Cached match decision for intent '{signature}'")
+            return cached
+    
+    # Large catalogs: only the lexical top-k goes into the prompt
+    if settings.FORM_SHORTLIST_ENABLED and len(forms) > settings.FORM_SHORTLIST_MIN_CATALOG:
+        forms = shortlist_forms(conversation_text, forms, settings.FORM_SHORTLIST_K)
+        print(f"   Shortlisted: {len(forms)} forms")
+    
     # =====================================
-    # Step 4: Prepare forms summary for AI
+    # Step 5: Prepare forms summary for AI
     # =====================================
     forms_summary = []
     for i, form in enumerate(forms):
@@ -266,21 +360,104 @@ async def match_form_from_conversation(conversation: List[Dict]) -> Optional[Dic
         print(f"   ... and {len(forms_summary) - 5} more forms")
     
     # =====================================
-    # Step 5: AI-powered intelligent matching
+    # Step 6: AI-powered intelligent matching
     # =====================================
-    matching_result = await ai_intelligent_match(conversation_text, forms_summary, forms)
+    matching_result = await ai_intelligent_match(
+        conversation_text, forms_summary, forms, decision_cache_key=decision_cache_key
+    )
     
     return matching_result
 
 
+# ========== MATCH DECISION CACHE ==========
+
+def cacheable_signature(conversation_text: str) -> str:
+    """
+    Intent signature to cache the decision under, or "" to skip the cache
+    Only complete signatures (a country and a purpose) of text without
+    origin / nationality cues or unknown places - anything else loses
+    information the LLM decided on
+    """
+    if not settings.AI_CACHE_ENABLED or settings.MATCH_CACHE_TTL <= 0:
+        return ""
+    if is_ambiguous_text(conversation_text):
+        return ""
+    intent = extract_intent(conversation_text)
+    if not intent["countries"] or not intent["purposes"]:
+        return ""
+    return intent_signature(conversation_text)
+
+
+def decision_fits_intent(conversation_text: str, matched_forms: List[Dict]) -> bool:
+    """Every decided form has one of the signature's countries and purposes"""
+    intent = extract_intent(conversation_text)
+    for form in matched_forms:
+        target = form_intent(form)
+        if not target["countries"] & intent["countries"] or not target["purposes"] & intent["purposes"]:
+            return False
+    return bool(matched_forms)
+
+
+def match_decision_cache_key(signature: str, catalog_version: str) -> str:
+    raw = f"match_decision|{catalog_version}|{signature}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def get_cached_match_decision(cache_key: str, forms: List[Dict]) -> Optional[Dict]:
+    """Rebuild a cached SINGLE/MULTIPLE result from the current forms (None on miss)"""
+    raw = await match_decision_cache.get(cache_key)
+    if raw is None:
+        return None
+    
+    try:
+        decision = json.loads(raw)
+    except ValueError:
+        return None
+    
+    positions = {f.get("form_id"): i for i, f in enumerate(forms)}
+    indices = [positions.get(form_id) for form_id in decision.get("form_ids", [])]
+    if not indices or None in indices:
+        return None
+    
+    if decision.get("match_type") == "SINGLE":
+        return forms[indices[0]]
+    
+    return {
+        "form_id": "MULTIPLE_MATCHES",
+        "title": "Multiple Forms Available",
+        "matched_forms": [forms[i] for i in indices],
+        "reasoning": decision.get("reasoning", ""),
+        "indices": indices
+    }
+
+
+async def store_match_decision(
+    cache_key: Optional[str],
+    conversation_text: str,
+    match_type: str,
+    matched_forms: List[Dict],
+    reasoning: str = ""
+):
+    if not cache_key or not decision_fits_intent(conversation_text, matched_forms):
+        return
+    decision = {
+        "match_type": match_type,
+        "form_ids": [f.get("form_id") for f in matched_forms],
+        "reasoning": reasoning
+    }
+    await match_decision_cache.set(cache_key, json.dumps(decision), settings.MATCH_CACHE_TTL)
+
+
 async def ai_intelligent_match(
     conversation_text: str, 
     forms_summary: List[Dict],
-    forms: List[Dict]
+    forms: List[Dict],
+    decision_cache_key: Optional[str] = None
 ) -> Optional[Dict]:
     """
     Let AI intelligently match forms based on conversation
     AI decides: single match, multiple matches, or no match
+    SINGLE/MULTIPLE decisions are cached under decision_cache_key (if given)
     """
     
     ai_prompt = f"""You are an expert visa consultant with deep knowledge of visa types and requirements.
@@ -374,7 +551,8 @@ Return ONLY valid JSON, nothing else:"""
             messages=[{"role": "user", "content": ai_prompt}],
             system_prompt="You are a visa form matching expert. Analyze carefully and return only valid JSON with your matching decision.",
             temperature=0.3,
-            max_tokens=500
+            max_tokens=500,
+            call_site="form_matching"
         )
         
         # Parse AI response
@@ -428,6 +606,9 @@ Return ONLY valid JSON, nothing else:"""
                 return await handle_no_match(ai_decision)
             
             print(f"   ✅ Result: MULTIPLE matches → {len(matched_forms)} forms")
+            await store_match_decision(
+                decision_cache_key, conversation_text, "MULTIPLE", matched_forms, ai_decision.get("reasoning", "")
+            )
             
             return {
                 "form_id": "MULTIPLE_MATCHES",
@@ -446,6 +627,7 @@ Return ONLY valid JSON, nothing else:"""
             
             matched_form = forms[matched_indices[0]]
             print(f"   ✅ Result: SINGLE match → {matched_form['title']}")
+            await store_match_decision(decision_cache_key, conversation_text, "SINGLE", [matched_form])
             
             return matched_form
     
@@ -0,0 +1,191 @@
+"""
+Structured Intent Extraction
+Country gazetteer (with aliases) + visa-purpose synonym table, applied to both
+the conversation and each form's country / visa_type / purpose_keywords / title
+(the same data fallback_keyword_match scores on).
+When the user names exactly one country and one purpose and exactly one form
+carries both, form matching returns it without any LLM call; anything
+ambiguous is left to the LLM matcher.
+"""
+
+import re
+from typing import Dict, List, Optional, Set
+
+# canonical country -> aliases (lowercase, matched on word boundaries)
+# Destinations only - no demonyms: "indian" / "british" usually describe the
+# applicant, not where they are going
+COUNTRY_ALIASES = {
+    "united states": ["united states", "usa", "u.s.a", "u.s", "america"],
+    "united kingdom": ["united kingdom", "uk", "u.k", "britain", "great britain", "england", "scotland", "wales"],
+    "canada": ["canada"],
+    "australia": ["australia"],
+    "new zealand": ["new zealand", "nz"],
+    "ireland": ["ireland"],
+    "germany": ["germany", "deutschland"],
+    "france": ["france"],
+    "spain": ["spain"],
+    "italy": ["italy"],
+    "netherlands": ["netherlands", "holland"],
+    "schengen": ["schengen"],
+    "japan": ["japan"],
+    "china": ["china"],
+    "south korea": ["south korea", "korea"],
+    "singapore": ["singapore"],
+    "malaysia": ["malaysia"],
+    "india": ["india"],
+    "united arab emirates": ["united arab emirates", "uae", "dubai", "abu dhabi", "emirates"],
+    "saudi arabia": ["saudi arabia", "saudi", "ksa"],
+}
+
+# "US" only counts in upper case ("us" is a pronoun)
+_US_UPPER = re.compile(r"(?<![\w.])US(?!\w)")
+
+# The applicant's origin / nationality - the text names more than a destination
+ORIGIN_CUES = re.compile(
+    r"\b(?:from|citizen\w*|nationality|national of|native of|born in|living in|"
+    r"i live in|we live in|resident of|residing in|based in|passport holder)\b"
+)
+
+# Demonyms describe the applicant ("I'm an Indian student") - a nationality cue
+NATIONALITY_WORDS = re.compile(
+    r"\b(?:american|british|canadian|australian|irish|german|french|spanish|"
+    r"italian|dutch|japanese|chinese|korean|indian|emirati|bangladeshi|"
+    r"pakistani|nepali|nepalese|sri lankan|nigerian|ghanaian|kenyan|filipino|"
+    r"indonesian|vietnamese|thai|malaysian|egyptian|turkish|iranian|brazilian|mexican)\b"
+)
+
+# Capitalized word after a destination preposition ("to Bangladesh", "in Peru")
+_PLACE_AFTER_PREPOSITION = re.compile(r"\b(?:to|in|visit|visiting|into)\s+(?:the\s+)?([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+NOT_PLACES = {
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "monday", "tuesday",
+    "wednesday", "thursday", "friday", "saturday", "sunday", "english", "i"
+}
+
+# canonical purpose -> synonyms (a trailing * matches any word ending)
+# Only unambiguous cues: bare "course" / "school" also occur in "of course" /
+# "school trip". Visit / travel / trip count as tourist, so "visit ... to
+# study" names two purposes and is left to the LLM
+PURPOSE_SYNONYMS = {
+    "student": ["student*", "study", "studies", "studying", "university", "college",
+                "masters", "master's", "phd", "bachelor*", "degree", "education*",
+                "a course", "language course", "enrol*", "enroll*"],
+    "tourist": ["touris*", "vacation", "holiday*", "sightseeing", "visitor", "leisure",
+                "visit", "visiting", "travel", "travelling", "traveling", "trip"],
+    "work": ["work", "working", "worker", "job", "employment", "employ*", "skilled"],
+    "business": ["business*", "conference", "meeting*", "trade", "investor"],
+    "transit": ["transit", "layover", "connecting flight"],
+    "family": ["family", "spouse", "partner", "dependent*", "dependant*", "parents", "marriage"],
+    "medical": ["medical", "treatment", "hospital"],
+}
+
+
+def _compile(table: Dict[str, List[str]]) -> Dict[str, re.Pattern]:
+    patterns = {}
+    for canonical, aliases in table.items():
+        parts = []
+        for alias in sorted(aliases, key=len, reverse=True):
+            if alias.endswith("*"):
+                parts.append(re.escape(alias[:-1]) + r"\w*")
+            else:
+                parts.append(re.escape(alias) + r"\.?")
+        patterns[canonical] = re.compile(r"(?<![\w.])(?:" + "|".join(parts) + r")(?!\w)")
+    return patterns
+
+
+_COUNTRY_PATTERNS = _compile(COUNTRY_ALIASES)
+_PURPOSE_PATTERNS = _compile(PURPOSE_SYNONYMS)
+
+
+def extract_intent(text: str) -> Dict[str, Set[str]]:
+    """Canonical countries and purposes mentioned in free text"""
+    lower = (text or "").lower()
+    countries = {c for c, pattern in _COUNTRY_PATTERNS.items() if pattern.search(lower)}
+    if _US_UPPER.search(text or ""):
+        countries.add("united states")
+    return {
+        "countries": countries,
+        "purposes": {p for p, pattern in _PURPOSE_PATTERNS.items() if pattern.search(lower)},
+    }
+
+
+def has_unrecognized_place(text: str) -> bool:
+    """A capitalized place after to/in/visit that the gazetteer does not know"""
+    for match in _PLACE_AFTER_PREPOSITION.finditer(text or ""):
+        place = match.group(1)
+        if place.lower() in NOT_PLACES:
+            continue
+        known = extract_intent(place)
+        if not known["countries"] and not known["purposes"]:
+            return True
+    return False
+
+
+def is_ambiguous_text(text: str) -> bool:
+    """Origin / nationality cues or unknown places: let the LLM read the full text"""
+    lower = (text or "").lower()
+    return bool(ORIGIN_CUES.search(lower) or NATIONALITY_WORDS.search(lower)) or has_unrecognized_place(text)
+
+
+def intent_signature(text: str) -> str:
+    """
+    Normalized intent key ("countries|purposes", sorted canonical names)
+    Empty when the text names neither a country nor a purpose
+    """
+    intent = extract_intent(text)
+    if not intent["countries"] and not intent["purposes"]:
+        return ""
+    return ",".join(sorted(intent["countries"])) + "|" + ",".join(sorted(intent["purposes"]))
+
+
+# (form_id, country, visa_type, title) -> intent; forms rarely change
+_form_intents: Dict[tuple, Dict[str, Set[str]]] = {}
+
+
+def form_intent(form: Dict) -> Dict[str, Set[str]]:
+    """Canonical country (from the country field) and purposes of a form"""
+    key = (form.get("form_id"), form.get("country"), form.get("visa_type"), form.get("title"))
+    cached = _form_intents.get(key)
+    if cached is None:
+        if len(_form_intents) > 10000:
+            _form_intents.clear()
+        cached = _form_intents[key] = _extract_form_intent(form)
+    return cached
+
+
+def _extract_form_intent(form: Dict) -> Dict[str, Set[str]]:
+    purpose_text = " ".join([
+        form.get("visa_type") or "",
+        form.get("title") or "",
+        " ".join(str(k) for k in form.get("purpose_keywords") or [])
+    ])
+    return {
+        "countries": extract_intent(form.get("country") or "")["countries"],
+        "purposes": extract_intent(purpose_text)["purposes"],
+    }
+
+
+def fast_match(conversation_text: str, forms: List[Dict]) -> Optional[Dict]:
+    """
+    The one form matching an unambiguous intent, or None to escalate to the LLM
+    Unambiguous = no origin / nationality cues or unknown places, exactly one
+    country and one purpose in the conversation, and exactly one form with
+    that country whose purposes include it
+    """
+    if is_ambiguous_text(conversation_text):
+        return None
+    intent = extract_intent(conversation_text)
+    if len(intent["countries"]) != 1 or len(intent["purposes"]) != 1:
+        return None
+
+    country = next(iter(intent["countries"]))
+    purpose = next(iter(intent["purposes"]))
+    candidates = []
+    for form in forms:
+        target = form_intent(form)
+        if country in target["countries"] and purpose in target["purposes"]:
+            candidates.append(form)
+
+    if len(candidates) != 1:
+        return None
+    return candidates[0]
@@ -0,0 +1,99 @@
+"""
+Multi-Keyword Scanner (Aho-Corasick)
+Compiles a keyword list once and finds every keyword in a text in a single
+pass, so the keyword tiers (topic check, help detection, correction detection,
+early matching) cost O(message length) regardless of how many keywords or
+form field labels they check.
+Matches are plain substrings, exactly like `kw in text`.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a fixed set of (lowercase) keywords"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self.max_length = max((len(k) for k in self.keywords), default=0)
+
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(keyword)
+
+        # Breadth-first failure links; outputs inherit their fallback's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(start index, keyword) for every occurrence, in order of match end"""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword in self._out[state]:
+                yield i - len(keyword) + 1, keyword
+
+    def find_all(self, text: str) -> List[str]:
+        """Distinct keywords present in text, in order of first occurrence"""
+        return list(dict.fromkeys(keyword for _, keyword in self.iter_matches(text)))
+
+    def contains_any(self, text: str) -> bool:
+        return next(self.iter_matches(text), None) is not None
+
+    def first_match(self, text: str) -> Optional[str]:
+        match = next(self.iter_matches(text), None)
+        return match[1] if match else None
+
+    def starts_with_any(self, text: str) -> bool:
+        """True if text starts with one of the keywords (scans at most max_length chars)"""
+        return any(start == 0 for start, _ in self.iter_matches(text[:self.max_length]))
+
+
+# form_id -> (fields list the automaton was built from, automaton)
+_label_automata: Dict[str, Tuple[list, KeywordAutomaton]] = {}
+
+
+def field_label_automaton(form: Dict, min_length: int = 4) -> KeywordAutomaton:
+    """
+    Automaton over a form's (lowercase) field labels, built once per loaded form
+    Cached forms are shared objects, so the automaton is rebuilt only when the
+    form is reloaded (its fields list changes)
+    """
+    form_id = form.get("form_id")
+    fields = form.get("fields", [])
+    cached = _label_automata.get(form_id)
+    if cached is not None and cached[0] is fields:
+        return cached[1]
+
+    automaton = KeywordAutomaton(
+        label for label in (f.get("label", "").lower() for f in fields) if len(label) >= min_length
+    )
+    if form_id:
+        if len(_label_automata) > 1000:
+            _label_automata.clear()
+        _label_automata[form_id] = (fields, automaton)
+    return automaton
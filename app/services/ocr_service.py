@@ -13,6 +13,7 @@ from PIL import Image
 
 from app.core.config import settings
 from app.services.ai_service import call_openai_with_image, call_openai_chat
+from app.services.ai_governor import LANE_BACKGROUND
 
 def encode_image(image: Image.Image) -> str:
     """Convert PIL image to base64"""
@@ -99,7 +100,9 @@ Extract EVERY field you see. Don't skip any!"""
                     text_prompt=ocr_prompt,
                     base64_image=base64_image,
                     temperature=0.1,
-                    max_tokens=settings.OCR_MAX_TOKENS
+                    max_tokens=settings.OCR_MAX_TOKENS,
+                    priority=LANE_BACKGROUND,
+                    call_site="ocr_page"
                 )
                 
                 # Parse JSON response
@@ -339,7 +342,9 @@ Extract as many fields as you can find. Return ONLY JSON:"""
             messages=[{"role": "user", "content": fields_prompt}],
             system_prompt="Extract all form fields. Return only JSON.",
             temperature=0.5,
-            max_tokens=4000  # ✅ Increased from 2000 to 4000
+            max_tokens=4000,  # ✅ Increased from 2000 to 4000
+            priority=LANE_BACKGROUND,
+            call_site="ocr_full_context_fields"
         )
         
         # Parse response
@@ -395,7 +400,9 @@ Return ONLY JSON:"""
             messages=[{"role": "user", "content": metadata_prompt}],
             system_prompt="Extract form metadata. Return only JSON.",
             temperature=0.5,
-            max_tokens=300
+            max_tokens=300,
+            priority=LANE_BACKGROUND,
+            call_site="form_metadata"
         )
         
         # Parse
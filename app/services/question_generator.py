@@ -2,8 +2,24 @@
 Question Generation & Help System
 ✅ IMPROVED: More natural, conversational questions
 """
-from typing import Dict
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.storage import save_form_questions
 from app.services.ai_service import call_openai_chat
+from app.services.ai_governor import LANE_BACKGROUND, LANE_INTERACTIVE
+from app.services.keyword_automaton import KeywordAutomaton
+from app.services.token_budget import count_tokens
+
+
+def clean_question(question: str) -> str:
+    """Strip accidental numbering / progress prefixes from a generated question"""
+    question = question.strip()
+    question = re.sub(r'^\d+[\.\)]\s*', '', question)
+    question = re.sub(r'^Question \d+[:/]\s*', '', question, flags=re.IGNORECASE)
+    return question
 
 
 async def generate_question_for_field(field: Dict, idx: int, total: int) -> str:
@@ -11,11 +27,22 @@ async def generate_question_for_field(field: Dict, idx: int, total: int) -> str:
     Generate natural, conversational question for form field
     Progress shown as: Question 1/50, 2/50, etc.
     """
+    return _with_counter(await _generate_single_question(field), field, idx, total)
+
+
+def _with_counter(question: Optional[str], field: Dict, idx: int, total: int) -> str:
+    counter_prefix = f"Question {idx + 1}/{total}"
+    if question:
+        return f"{counter_prefix}: {question}"
+    # Fallback to simple format
+    return f"{counter_prefix}: Could you tell me your {field.get('label', '').lower()}?"
+
+
+async def _generate_single_question(field: Dict) -> Optional[str]:
+    """One field's question without progress prefix (None if generation failed)"""
     label = field.get("label", "")
     field_type = field.get("type", "text")
     
-    counter_prefix = f"Question {idx + 1}/{total}"
-    
     prompt = f"""Generate a natural, conversational question for this visa form field:
 
 Field: {label}
@@ -46,24 +73,293 @@ Generate a natural question:"""
             messages=[{"role": "user", "content": prompt}],
             system_prompt="You are a friendly visa consultant. Ask questions naturally, like talking to a friend. Be warm and clear.",
             temperature=0.8,
-            max_tokens=150
+            max_tokens=150,
+            cache_ttl=settings.QUESTION_CACHE_TTL,
+            call_site="question_generation"
         )
         
-        # Clean up the response
-        question = question.strip()
+        # Clean up the response (remove any accidental numbering)
+        return clean_question(question) or None
         
-        # Remove any accidental numbering
-        import re
-        question = re.sub(r'^\d+[\.\)]\s*', '', question)
-        question = re.sub(r'^Question \d+[:/]\s*', '', question, flags=re.IGNORECASE)
+    except Exception as e:
+        print(f"Question generation failed: {e}")
+        return None
+
+
+# ========== BATCHED GENERATION & QUESTION BANK ==========
+
+# Rough completion tokens for one question inside the JSON response
+QUESTION_TOKENS_PER_FIELD = 60
+
+
+def _field_spec(field: Dict) -> Dict:
+    return {"id": str(field.get("id")), "label": field.get("label", ""), "type": field.get("type", "text")}
+
+
+def _chunk_fields(fields: List[Dict], budget: int) -> List[List[Dict]]:
+    """Split fields so each completion's field list + answers stay within budget tokens"""
+    chunks, current, used = [], [], 0
+    for field in fields:
+        cost = count_tokens(json.dumps(_field_spec(field))) + QUESTION_TOKENS_PER_FIELD
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(field)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def generate_questions_batch(
+    fields: List[Dict],
+    priority: str = LANE_INTERACTIVE
+) -> Dict[str, str]:
+    """
+    Generate questions for many fields with one structured JSON completion per
+    chunk (chunked by QUESTION_BATCH_TOKEN_BUDGET, chunks run concurrently)
+    
+    Returns:
+        {field_id: question} without progress prefix - fields the model
+        skipped are simply absent
+    """
+    if not fields:
+        return {}
+    chunks = _chunk_fields(fields, settings.QUESTION_BATCH_TOKEN_BUDGET)
+    results = await asyncio.gather(*(_generate_chunk(chunk, priority) for chunk in chunks))
+    
+    questions = {}
+    for result in results:
+        questions.update(result)
+    print(f"📝 Batched questions: {len(questions)}/{len(fields)} in {len(chunks)} completion(s)")
+    return questions
+
+
+async def _generate_chunk(fields: List[Dict], priority: str) -> Dict[str, str]:
+    fields_json = json.dumps([_field_spec(f) for f in fields], indent=2)
+    
+    prompt = f"""Generate natural, conversational questions for these visa form fields:
+
+{fields_json}
+
+Requirements for EACH question:
+- Make it sound like a friend asking, not a robot
+- Be clear and specific
+- Add helpful format hints if needed (dates, emails, etc.)
+- Keep it under 2 sentences
+- Be warm and encouraging
+- NO numbering or progress indicators in the question itself
+
+Examples:
+❌ Bad: "Please enter your full name"
+✅ Good: "What's your full name as it appears on your passport?"
+
+❌ Bad: "Provide date of birth"
+✅ Good: "When were you born? (Please use DD/MM/YYYY format)"
+
+Return JSON ONLY, one entry per field id:
+{{
+  "questions": {{
+    "<field id>": "question"
+  }}
+}}"""
+    
+    try:
+        response = await call_openai_chat(
+            messages=[{"role": "user", "content": prompt}],
+            system_prompt="You are a friendly visa consultant. Ask questions naturally, like talking to a friend. Return only JSON.",
+            temperature=0.7,
+            max_tokens=QUESTION_TOKENS_PER_FIELD * len(fields) + 100,
+            cache_ttl=settings.QUESTION_CACHE_TTL,
+            priority=priority,
+            call_site="question_batch"
+        )
         
-        # Return with counter prefix
-        return f"{counter_prefix}: {question}"
+        if "```json" in response:
+            response = response.split("```json")[1].split("```")[0].strip()
+        elif "```" in response:
+            response = response.split("```")[1].split("```")[0].strip()
         
+        questions = json.loads(response).get("questions", {})
+        wanted = {str(f.get("id")) for f in fields}
+        return {
+            str(field_id): clean_question(question)
+            for field_id, question in questions.items()
+            if str(field_id) in wanted and isinstance(question, str) and question.strip()
+        }
+    
     except Exception as e:
-        print(f"Question generation failed: {e}")
-        # Fallback to simple format
-        return f"{counter_prefix}: Could you tell me your {label.lower()}?"
+        print(f"⚠️  Question batch failed ({len(fields)} fields): {e}")
+        return {}
+
+
+async def generate_question_bank(fields: List[Dict]) -> Dict[str, str]:
+    """Questions for every field of a form, generated at upload (background lane)"""
+    return await generate_questions_batch(fields, priority=LANE_BACKGROUND)
+
+
+# form_id -> {batch task: field ids it covers}; in-flight windows are never
+# generated twice (and the dict keeps a reference so tasks are not collected)
+_question_batches: Dict[str, Dict[asyncio.Task, Set[str]]] = {}
+
+
+async def _backfill_question_bank(form_id: str, fields: List[Dict]) -> Dict[str, str]:
+    questions = await generate_question_bank(fields)
+    if questions:
+        await save_form_questions(form_id, questions)
+    return questions
+
+
+def _forget_batch(form_id: str, task: asyncio.Task):
+    batches = _question_batches.get(form_id)
+    if batches is not None:
+        batches.pop(task, None)
+        if not batches:
+            del _question_batches[form_id]
+    if not task.cancelled() and task.exception():
+        print(f"⚠️  Question batch failed for {form_id}: {task.exception()}")
+
+
+def question_batch_for(form_id: str, field_id: str) -> Optional[asyncio.Task]:
+    """The in-flight background batch generating this field's question, if any"""
+    for task, field_ids in _question_batches.get(form_id, {}).items():
+        if field_id in field_ids:
+            return task
+    return None
+
+
+def schedule_question_bank_backfill(form: Dict, skip_ids=(), start: int = 0, limit: Optional[int] = None):
+    """
+    Generate and store the missing questions of a form in the background
+    start / limit restrict it to a window of fields (look-ahead after a miss);
+    fields an in-flight batch already covers are left out
+    """
+    form_id = form.get("form_id")
+    if not form_id:
+        return
+    bank = form.get("question_bank") or {}
+    covered = set().union(*_question_batches.get(form_id, {}).values())
+    fields = form.get("fields", [])[start:]
+    if limit is not None:
+        fields = fields[:limit]
+    missing = [
+        f for f in fields
+        if str(f.get("id")) not in bank and str(f.get("id")) not in skip_ids and str(f.get("id")) not in covered
+    ]
+    if not missing:
+        return
+    task = asyncio.create_task(_backfill_question_bank(form_id, missing))
+    _question_batches.setdefault(form_id, {})[task] = {str(f.get("id")) for f in missing}
+    task.add_done_callback(lambda done: _forget_batch(form_id, done))
+
+
+async def _await_question_batch(task: asyncio.Task, field_id: str) -> Optional[str]:
+    """This field's question from an in-flight batch, waiting at most QUESTION_BATCH_WAIT"""
+    try:
+        # shield: giving up (or this turn being cancelled) must not cancel the batch
+        questions = await asyncio.wait_for(asyncio.shield(task), settings.QUESTION_BATCH_WAIT)
+    except asyncio.TimeoutError:
+        return None
+    except Exception as e:
+        print(f"⚠️  Question batch failed: {e}")
+        return None
+    return questions.get(field_id)
+
+
+async def question_for_field(form: Dict, field: Dict, idx: int, total: int) -> str:
+    """
+    Question for a field from the form's pre-generated bank (no LLM call)
+    On a miss only this field is generated on the interactive lane (unless a
+    background batch is already generating it); the next
+    QUESTION_PREFETCH_AHEAD missing fields (or, for forms without a bank, all
+    of them) are batched on the background lane and stored on the form
+    """
+    bank = (form.get("question_bank") if form else None) or {}
+    field_id = str(field.get("id"))
+    question = bank.get(field_id)
+    if question:
+        return _with_counter(question, field, idx, total)
+    
+    if not form:
+        return await generate_question_for_field(field, idx, total)
+    
+    form_id = form.get("form_id")
+    batch = question_batch_for(form_id, field_id)
+    
+    if bank:
+        schedule_question_bank_backfill(
+            form, skip_ids={field_id}, start=idx + 1, limit=settings.QUESTION_PREFETCH_AHEAD
+        )
+    else:
+        # Form predates question banks - fill in the rest in the background
+        schedule_question_bank_backfill(form, skip_ids={field_id})
+    
+    if batch is not None:
+        question = await _await_question_batch(batch, field_id)
+        if question:
+            return _with_counter(question, field, idx, total)
+    
+    question = await _generate_single_question(field)
+    if question:
+        await save_form_questions(form_id, {field_id: question})
+    return _with_counter(question, field, idx, total)
+
+
+# Uncertainty during consultation - not a help request in a short message
+CONSULTATION_PHRASES = KeywordAutomaton([
+    "i'm not sure",
+    "im not sure",
+    "not sure yet",
+    "don't know yet",
+    "dont know yet",
+    "maybe",
+    "thinking about",
+    "possibly",
+    "probably"
+])
+
+# Explicit help requests - must be at START of message
+HELP_STARTERS = KeywordAutomaton([
+    "help",
+    "i need help",
+    "can you help",
+    "could you help",
+    "help me",
+    "how do i",
+    "how should i",
+    "how to",
+    "what do i",
+    "what should i",
+    "i don't know how",
+    "i dont know how",
+    "i don't understand",
+    "i dont understand",
+    "confused",
+    "example",
+    "give me an example",
+    "show me",
+    "can you explain",
+    "what does this mean",
+    "i'm confused",
+    "im confused"
+])
+
+# Help keywords anywhere in a short message
+HELP_KEYWORDS = KeywordAutomaton([
+    "help me",
+    "how should",
+    "what should",
+    "confused",
+    "example",
+    "show me",
+    "explain",
+    "don't know",
+    "dont know",
+    "not sure how",
+    "how do"
+])
+
+QUESTION_HELP_WORDS = KeywordAutomaton(["how", "what", "help", "explain", "mean"])
 
 
 def is_help_request(message: str) -> bool:
@@ -72,93 +368,34 @@ def is_help_request(message: str) -> bool:
     ✅ IMPROVED: More precise, avoids false positives during consultation
     """
     message_lower = message.lower().strip()
+    words = message_lower.split()
     
     # ============================================
     # STEP 1: Filter out consultation uncertainty
     # ============================================
-    # These phrases indicate uncertainty during initial chat,
-    # NOT help requests during form filling
-    consultation_phrases = [
-        "i'm not sure",
-        "im not sure", 
-        "not sure yet",
-        "don't know yet",
-        "dont know yet",
-        "maybe",
-        "thinking about",
-        "possibly",
-        "probably"
-    ]
-    
     # If message is just expressing uncertainty (short message)
-    for phrase in consultation_phrases:
-        if phrase in message_lower and len(message_lower.split()) < 10:
-            return False  # Not asking for help, just uncertain
+    if len(words) < 10 and CONSULTATION_PHRASES.contains_any(message_lower):
+        return False  # Not asking for help, just uncertain
     
     # ============================================
     # STEP 2: Check for explicit help requests
     # ============================================
-    # Must be at START of message or be a short question
-    help_starters = [
-        "help",
-        "i need help",
-        "can you help",
-        "could you help",
-        "help me",
-        "how do i",
-        "how should i",
-        "how to",
-        "what do i",
-        "what should i",
-        "i don't know how",
-        "i dont know how",
-        "i don't understand",
-        "i dont understand",
-        "confused",
-        "example",
-        "give me an example",
-        "show me",
-        "can you explain",
-        "what does this mean",
-        "i'm confused",
-        "im confused"
-    ]
-    
     # Check if message STARTS with help keywords
-    for starter in help_starters:
-        if message_lower.startswith(starter):
-            return True
+    if HELP_STARTERS.starts_with_any(message_lower):
+        return True
     
     # ============================================
     # STEP 3: Check for short help questions
     # ============================================
-    words = message_lower.split()
-    
     # Short messages (< 15 words) with help keywords
-    if len(words) <= 15:
-        help_keywords = [
-            "help me",
-            "how should",
-            "what should", 
-            "confused",
-            "example",
-            "show me",
-            "explain",
-            "don't know",
-            "dont know",
-            "not sure how",
-            "how do"
-        ]
-        
-        if any(kw in message_lower for kw in help_keywords):
-            return True
+    if len(words) <= 15 and HELP_KEYWORDS.contains_any(message_lower):
+        return True
     
     # ============================================
     # STEP 4: Check for question marks with help words
     # ============================================
     if "?" in message and len(words) <= 12:
-        question_help_words = ["how", "what", "help", "explain", "mean"]
-        if any(word in message_lower for word in question_help_words):
+        if QUESTION_HELP_WORDS.contains_any(message_lower):
             return True
     
     # If message is long (> 15 words) without clear help keywords,
@@ -205,7 +442,8 @@ Generate helpful guidance:"""
             messages=[{"role": "user", "content": prompt}],
             system_prompt="You are a warm, patient visa consultant helping a friend. Be clear, encouraging, and use real examples. Keep it conversational.",
             temperature=0.7,
-            max_tokens=300
+            max_tokens=300,
+            call_site="field_help"
         )
         
         return help_text.strip()
@@ -0,0 +1,85 @@
+"""
+Speculative Question Prefetch
+While the current answer is being validated, the question for the next field
+is already generated in the background; the turn then picks it up instead of
+starting a second LLM round trip after validation.
+One pending prefetch per session, keyed by (form_id, field index) - if
+validation fails or a correction redirects the flow it is cancelled.
+No prefetch starts for a field a background question batch is already
+generating; the turn waits for that batch instead (see question_for_field).
+"""
+
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.question_generator import question_batch_for, question_for_field
+
+
+class QuestionPrefetcher:
+    """Pending next-question tasks per session_id"""
+
+    def __init__(self):
+        self._pending: Dict[str, Tuple[Tuple[str, int], asyncio.Task]] = {}
+        self.stats = {"started": 0, "hits": 0, "discarded": 0, "skipped": 0}
+
+    def start(self, session_id: str, form: Optional[Dict], idx: int):
+        """Start generating the question for field `idx` of `form`"""
+        self.discard(session_id)
+        if not settings.QUESTION_PREFETCH_ENABLED or not form:
+            return
+
+        fields = form.get("fields", [])
+        if idx >= len(fields):
+            return
+        field = fields[idx]
+        field_id = str(field.get("id"))
+        if field_id in (form.get("question_bank") or {}) or question_batch_for(form.get("form_id"), field_id):
+            # Served from the bank (or the batch already generating it) anyway
+            self.stats["skipped"] += 1
+            return
+
+        task = asyncio.create_task(question_for_field(form, field, idx, len(fields)))
+        self._pending[session_id] = ((form.get("form_id"), idx), task)
+        self.stats["started"] += 1
+
+    async def take(self, session_id: str, form: Optional[Dict], idx: int) -> Optional[str]:
+        """The prefetched question for field `idx`, or None if there is none (or it failed)"""
+        entry = self._pending.pop(session_id, None)
+        if entry is None:
+            return None
+
+        key, task = entry
+        if not form or key != (form.get("form_id"), idx):
+            self._cancel(task)
+            return None
+
+        try:
+            question = await task
+        except Exception as e:
+            print(f"⚠️  Question prefetch failed: {e}")
+            return None
+        self.stats["hits"] += 1
+        return question
+
+    def discard(self, session_id: str):
+        entry = self._pending.pop(session_id, None)
+        if entry is not None:
+            self._cancel(entry[1])
+
+    def _cancel(self, task: asyncio.Task):
+        """Stale prefetch: stop it so it does not hold a governor slot"""
+        self.stats["discarded"] += 1
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.exception():
+            print(f"⚠️  Discarded question prefetch failed: {task.exception()}")
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["pending"] = len(self._pending)
+        stats["hit_rate"] = round(self.stats["hits"] / self.stats["started"], 4) if self.stats["started"] else 0.0
+        return stats
+
+
+question_prefetcher = QuestionPrefetcher()
@@ -5,14 +5,26 @@ Smart Answer Correction Service
 """
 
 from typing import Dict, Optional
+from app.core.config import settings
 from app.core.storage import load_conversation, get_form_by_id
 from app.services.ai_service import call_openai_chat
+from app.services.token_budget import fit_user_text
+from app.services.keyword_automaton import KeywordAutomaton, field_label_automaton
 import json
 
 
-async def detect_answer_correction(session_id: str, message: str, data: dict) -> Dict:
+CORRECTION_KEYWORDS = KeywordAutomaton([
+    "sorry", "wait", "actually", "correction", "mistake",
+    "wrong", "change", "update", "fix", "meant to say",
+    "i mean", "should be", "correct answer", "my bad",
+    "oops", "no wait", "i said", "earlier i"
+])
+
+
+async def detect_answer_correction(session_id: str, message: str, data: dict, form: Optional[Dict] = None) -> Dict:
     """
     Detect if user is correcting a previous answer
+    Pass `form` when the caller already has the matched form loaded
     
     Returns:
         {
@@ -34,31 +46,20 @@ async def detect_answer_correction(session_id: str, message: str, data: dict) ->
     if not form_id:
         return {"is_correction": False}
     
-    form = await get_form_by_id(form_id)
+    if form is None:
+        form = await get_form_by_id(form_id)
     if not form:
         return {"is_correction": False}
     
     fields = form.get("fields", [])
     
     # Quick keyword check first
-    correction_keywords = [
-        "sorry", "wait", "actually", "correction", "mistake", 
-        "wrong", "change", "update", "fix", "meant to say",
-        "i mean", "should be", "correct answer", "my bad",
-        "oops", "no wait", "i said", "earlier i"
-    ]
-    
     message_lower = message.lower()
-    has_correction_keyword = any(kw in message_lower for kw in correction_keywords)
+    has_correction_keyword = CORRECTION_KEYWORDS.contains_any(message_lower)
     
     if not has_correction_keyword:
-        # Check if message references a previous field
-        for field in fields:
-            field_label_lower = field.get("label", "").lower()
-            # Check for field label mentions
-            if len(field_label_lower) > 3 and field_label_lower in message_lower:
-                has_correction_keyword = True
-                break
+        # Check if message references a previous field (label mentions)
+        has_correction_keyword = field_label_automaton(form).contains_any(message_lower)
     
     if not has_correction_keyword:
         return {"is_correction": False}
@@ -89,12 +90,9 @@ async def ai_detect_correction(message: str, answers: Dict, fields: list, data:
     
     # Get recent conversation for context
     history = data.get("history", [])
-    recent_messages = []
-    for msg in history[-6:]:  # Last 6 messages
-        if msg.get("role") == "user":
-            recent_messages.append(msg.get("content"))
+    recent_messages = [m for m in history[-6:] if m.get("role") == "user"][-3:]  # Last 3 user messages
     
-    context_text = "\n".join(recent_messages[-3:]) if recent_messages else ""
+    context_text = fit_user_text(recent_messages, settings.CORRECTION_CONTEXT_TOKEN_BUDGET, separator="\n")
     
     prompt = f"""Analyze if the user wants to CORRECT a previous answer.
 
@@ -151,7 +149,8 @@ Return ONLY valid JSON:"""
             messages=[{"role": "user", "content": prompt}],
             system_prompt="You are an expert at understanding user intent in form corrections. Be precise and confident. Return only JSON.",
             temperature=0.2,
-            max_tokens=400
+            max_tokens=400,
+            call_site="correction_detection"
         )
         
         # Parse JSON
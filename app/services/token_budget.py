@@ -0,0 +1,130 @@
+"""
+Prompt Token Budgeting
+Counts tokens per message and trims conversation history to a budget:
+recent turns are kept verbatim, older ones are dropped and replaced by a
+short digest of what the user said
+"""
+
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # optional - fall back to a character heuristic
+    tiktoken = None
+
+# Per-message framing overhead in the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoder = None
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None and tiktoken is not None:
+        try:
+            _encoder = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        except KeyError:
+            _encoder = tiktoken.get_encoding("cl100k_base")
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(message: Dict) -> int:
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def clip_text(text: str, max_tokens: int, keep: str = "end") -> str:
+    """Trim text to roughly max_tokens, keeping its start or (default) its end"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text)
+        tokens = tokens[-max_tokens:] if keep == "end" else tokens[:max_tokens]
+        return "…" + encoder.decode(tokens) if keep == "end" else encoder.decode(tokens) + "…"
+    max_chars = max_tokens * 4
+    return "…" + text[-max_chars:] if keep == "end" else text[:max_chars] + "…"
+
+
+def _digest(dropped: List[Dict], max_tokens: int) -> Optional[Dict]:
+    """One system message with what the user said in the dropped turns"""
+    said = [m["content"] for m in dropped if m.get("role") == "user" and m.get("content")]
+    if not said or max_tokens <= MESSAGE_OVERHEAD_TOKENS + 10:
+        return None
+    prefix = "Earlier in this conversation the user said: "
+    text = clip_text(" | ".join(said), max_tokens - MESSAGE_OVERHEAD_TOKENS - count_tokens(prefix))
+    return {"role": "system", "content": prefix + text}
+
+
+def fit_history(
+    messages: List[Dict],
+    budget: Optional[int] = None,
+    keep_recent: Optional[int] = None
+) -> List[Dict]:
+    """
+    Fit history into `budget` tokens for a completion call
+
+    The last `keep_recent` messages are always kept verbatim (clipped only if a
+    single message is larger than the whole budget); older messages are added
+    newest-first while they fit and the rest collapse into a digest.
+    Only role/content are passed on.
+    """
+    if budget is None:
+        budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+    if keep_recent is None:
+        keep_recent = settings.CHAT_HISTORY_KEEP_RECENT
+
+    trimmed = [{"role": m["role"], "content": m.get("content") or ""} for m in messages]
+    if sum(count_message_tokens(m) for m in trimmed) <= budget:
+        return trimmed
+
+    recent = trimmed[-keep_recent:] if keep_recent > 0 else []
+    older = trimmed[:len(trimmed) - len(recent)]
+
+    used = sum(count_message_tokens(m) for m in recent)
+    while used > budget and len(recent) > 1:
+        used -= count_message_tokens(recent.pop(0))
+    if used > budget and recent:
+        recent[0]["content"] = clip_text(recent[0]["content"], budget - MESSAGE_OVERHEAD_TOKENS)
+        used = count_message_tokens(recent[0])
+
+    kept_older = []
+    for message in reversed(older):
+        cost = count_message_tokens(message)
+        if used + cost > budget:
+            break
+        kept_older.insert(0, message)
+        used += cost
+
+    dropped = older[:len(older) - len(kept_older)]
+    digest = _digest(dropped, budget - used) if dropped else None
+
+    result = ([digest] if digest else []) + kept_older + recent
+    print(f"✂️  History trimmed: {len(messages)} → {len(result)} messages (~{budget} token budget)")
+    return result
+
+
+def fit_user_text(messages: List[Dict], budget: int, separator: str = " ") -> str:
+    """Join the user's messages, keeping the most recent ones that fit in `budget`"""
+    said = [m["content"] for m in messages if m.get("role") == "user" and m.get("content")]
+    kept = []
+    used = 0
+    for text in reversed(said):
+        cost = count_tokens(text) + 1
+        if used + cost > budget:
+            if not kept:
+                kept.append(clip_text(text, budget))
+            break
+        kept.insert(0, text)
+        used += cost
+    return separator.join(kept)
@@ -0,0 +1,102 @@
+"""
+Chat Load Driver
+Runs N concurrent scripted conversations against /api/chat and reports
+throughput and latency percentiles. Point the app at fake_openai_server.py
+(OPENAI_BASE_URL) for repeatable, zero-cost runs.
+
+Usage:
+    python -m loadtest.chat_load --base-url http://localhost:8000 --users 50 --turns 12
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import httpx
+
+OPENING_SCRIPT = [
+    "Hi",
+    "I want to study in USA",
+    "It's for a master's degree starting in September",
+    "yes"
+]
+
+ANSWERS = [
+    "John Smith",
+    "1990-01-15",
+    "A12345678",
+    "2020-05-01",
+    "2030-05-01",
+    "Bangladeshi",
+    "john.smith@example.com",
+    "+8801712345678",
+    "12 Lake Road, Dhaka",
+    "Higher studies"
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+async def run_user(client: httpx.AsyncClient, turns: int, latencies: List[float], errors: Dict[str, int]):
+    """One virtual user: opening script, then answers until `turns` messages"""
+    session_id = None
+    script = OPENING_SCRIPT + ANSWERS
+
+    for i in range(turns):
+        payload = {"message": script[i % len(script)]}
+        if session_id:
+            payload["session_id"] = session_id
+
+        started = time.monotonic()
+        try:
+            response = await client.post("/api/chat", json=payload)
+            latencies.append(time.monotonic() - started)
+            if response.status_code != 200:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                continue
+            session_id = response.json().get("session_id", session_id)
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+
+async def main(base_url: str, users: int, turns: int, timeout: float):
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(run_user(client, turns, latencies, errors) for _ in range(users)))
+        elapsed = time.monotonic() - started
+
+        try:
+            ai_stats = (await client.get("/api/metrics/ai")).json().get("ai", {})
+        except (httpx.HTTPError, ValueError):
+            ai_stats = {}
+
+    print(f"\n📊 {users} users x {turns} turns in {elapsed:.1f}s")
+    print(f"   Requests:   {len(latencies)} ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"   Latency:    p50={percentile(latencies, 0.5):.3f}s "
+          f"p95={percentile(latencies, 0.95):.3f}s p99={percentile(latencies, 0.99):.3f}s")
+    print(f"   Errors:     {errors or 'none'}")
+
+    for site, stats in ai_stats.get("call_sites", {}).items():
+        print(f"   AI {site}: {stats['calls']} calls, p95={stats['latency_seconds']['p95']}s, "
+              f"${stats['cost_usd']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /api/chat load driver")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.base_url, args.users, args.turns, args.timeout))
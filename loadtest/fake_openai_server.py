@@ -0,0 +1,323 @@
+"""
+Fake OpenAI Server - offline load testing
+OpenAI-compatible /v1/chat/completions (chat, vision, streaming) that returns
+canned or rule-generated JSON in the shapes our services parse
+
+Run:
+    uvicorn loadtest.fake_openai_server:app --port 9000
+    OPENAI_BASE_URL=http://localhost:9000/v1 uvicorn main:app
+
+Latency (lognormal, per prompt kind):
+    FAKE_OPENAI_LATENCY_MEDIAN_MS   default median for every kind (800)
+    FAKE_OPENAI_LATENCY_SIGMA       lognormal sigma (0.5)
+    FAKE_OPENAI_LATENCY_PROFILES    JSON overrides, e.g. '{"ocr": [3000, 0.3], "classifier": [200, 0.2]}'
+    FAKE_OPENAI_ERROR_RATE          fraction of requests answered with 429 (0.0)
+    FAKE_OPENAI_STREAM_CHUNK_MS     delay between streamed chunks (25)
+    FAKE_OPENAI_SEED                RNG seed for repeatable runs
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_MEDIAN_MS = float(os.getenv("FAKE_OPENAI_LATENCY_MEDIAN_MS", "800"))
+DEFAULT_SIGMA = float(os.getenv("FAKE_OPENAI_LATENCY_SIGMA", "0.5"))
+LATENCY_PROFILES: Dict[str, List[float]] = json.loads(os.getenv("FAKE_OPENAI_LATENCY_PROFILES", "{}"))
+ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+STREAM_CHUNK_MS = float(os.getenv("FAKE_OPENAI_STREAM_CHUNK_MS", "25"))
+
+rng = random.Random(os.getenv("FAKE_OPENAI_SEED"))
+
+app = FastAPI(title="Fake OpenAI", description="OpenAI-compatible stub for load testing")
+
+stats = {"requests": 0, "errors_injected": 0, "by_kind": {}}
+
+CANNED_FIELDS = [
+    {"label": "Full Name", "type": "text"},
+    {"label": "Date of Birth", "type": "date"},
+    {"label": "Passport Number", "type": "text"},
+    {"label": "Passport Issue Date", "type": "date"},
+    {"label": "Passport Expiry Date", "type": "date"},
+    {"label": "Nationality", "type": "text"},
+    {"label": "Email Address", "type": "email"},
+    {"label": "Phone Number", "type": "phone"},
+    {"label": "Home Address", "type": "text"},
+    {"label": "Purpose of Visit", "type": "text"}
+]
+
+
+# ========== PROMPT HELPERS ==========
+
+def _message_text(message: Dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "\n".join(p.get("text", "") for p in content if p.get("type") == "text")
+    return content or ""
+
+
+def _has_image(messages: List[Dict]) -> bool:
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, list) and any(p.get("type") == "image_url" for p in content):
+            return True
+    return False
+
+
+def _extract_json_block(text: str, header: str) -> Optional[object]:
+    """Parse the JSON that follows `header` in one of our prompts"""
+    idx = text.find(header)
+    if idx < 0:
+        return None
+    rest = text[idx + len(header):]
+    start = min([i for i in (rest.find("["), rest.find("{")) if i >= 0], default=-1)
+    if start < 0:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(rest[start:])
+        return value
+    except ValueError:
+        return None
+
+
+def _quoted_after(text: str, header: str) -> str:
+    match = re.search(re.escape(header) + r'\s*"(.*?)"', text, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+# ========== RULE-BASED RESPONDERS ==========
+
+def respond_form_match(prompt: str) -> str:
+    conversation = _quoted_after(prompt, "USER'S CONVERSATION:").lower()
+    forms = _extract_json_block(prompt, "AVAILABLE VISA FORMS:") or []
+
+    scored = []
+    for form in forms:
+        score = 0
+        country = str(form.get("country", "")).lower()
+        visa_type = str(form.get("visa_type", "")).lower()
+        if country and country in conversation:
+            score += 2
+        if visa_type and visa_type in conversation:
+            score += 1
+        if score:
+            scored.append((score, form.get("index", 0)))
+
+    if not scored:
+        return json.dumps({
+            "match_type": "NO_MATCH",
+            "matched_indices": [],
+            "confidence": 0.3,
+            "reasoning": "Country and purpose are not clear yet",
+            "missing_info": ["Which country?", "Purpose of visit?"]
+        })
+
+    scored.sort(reverse=True)
+    best_score = scored[0][0]
+    best = [idx for score, idx in scored if score == best_score]
+    return json.dumps({
+        "match_type": "SINGLE" if len(best) == 1 else "MULTIPLE",
+        "matched_indices": best,
+        "confidence": 0.9 if best_score >= 3 else 0.7,
+        "reasoning": "Matched on country and visa type"
+    })
+
+
+def respond_correction(prompt: str) -> str:
+    message = _quoted_after(prompt, "USER'S NEW MESSAGE:")
+    answered = _extract_json_block(prompt, "PREVIOUSLY ANSWERED FIELDS:") or []
+    lowered = message.lower()
+
+    target = None
+    for field in answered:
+        if str(field.get("label", "")).lower() in lowered:
+            target = field
+            break
+
+    if target is None or not any(w in lowered for w in ("actually", "sorry", "wrong", "should be", "change")):
+        return json.dumps({"is_correction": False, "confidence": 0.9, "reasoning": "Regular answer"})
+
+    new_answer = re.split(r"\bis\b|\bbe\b|:", message)[-1].strip(" .") or message
+    return json.dumps({
+        "is_correction": True,
+        "field_id": target.get("field_id"),
+        "field_label": target.get("label"),
+        "new_answer": new_answer,
+        "confidence": 0.9,
+        "reasoning": "User referenced a previously answered field"
+    })
+
+
+def respond_question(prompt: str) -> str:
+    match = re.search(r"Field:\s*(.+)", prompt)
+    label = match.group(1).strip() if match else "answer"
+    return f"Could you tell me your {label.lower()}?"
+
+
+def respond_question_bank(prompt: str) -> str:
+    try:
+        fields = json.loads(prompt[prompt.index("["):prompt.index("]\n") + 1])
+    except ValueError:
+        fields = []
+    return json.dumps({"questions": {
+        str(f.get("id")): f"Could you tell me your {str(f.get('label', 'answer')).lower()}?"
+        for f in fields
+    }})
+
+
+def classify(messages: List[Dict]) -> Tuple[str, str]:
+    """Returns (kind, response text) for a request"""
+    system = " ".join(_message_text(m) for m in messages if m.get("role") == "system")
+    prompt = "\n".join(_message_text(m) for m in messages if m.get("role") != "system")
+
+    if _has_image(messages):
+        return "ocr", json.dumps({"fields": CANNED_FIELDS})
+    if "topic classifier" in system:
+        return "classifier", "YES"
+    if "Validate this form answer" in prompt:
+        return "validator", json.dumps({"valid": True, "message": "Perfect! Got it."})
+    if "CORRECT a previous answer" in prompt:
+        return "correction", respond_correction(prompt)
+    if "AVAILABLE VISA FORMS:" in prompt:
+        return "form_match", respond_form_match(prompt)
+    if "recommend the BEST visa form" in prompt:
+        return "recommendation", json.dumps({
+            "recommended_index": 0,
+            "explanation": "It fits the purpose and destination you described."
+        })
+    if "Extract metadata from this visa form" in prompt:
+        filename = re.search(r"Filename:\s*(.+)", prompt)
+        title = filename.group(1).replace(".pdf", "").replace("_", " ").title() if filename else "Visa Form"
+        return "metadata", json.dumps({
+            "title": title,
+            "visa_type": "Tourist",
+            "country": "USA",
+            "purpose_keywords": ["tourism", "visit", "travel"]
+        })
+    if "Extract ALL form fields" in prompt:
+        return "ocr_text", json.dumps({"fields": CANNED_FIELDS})
+    if "Extract visa form answers from the user's message" in prompt:
+        return "bulk_extraction", json.dumps({"answers": {}})
+    if "conversational questions for these visa form fields" in prompt:
+        return "question_bank", respond_question_bank(prompt)
+    if "conversational question for this visa form field" in prompt:
+        return "question", respond_question(prompt)
+    if "needs help with this visa form field" in prompt:
+        return "help", "This asks for the details exactly as they appear on your passport. For example: 'John Smith'."
+    if "Update the running summary" in prompt:
+        return "summary", "The user wants a visa and has shared their destination and purpose of travel."
+    if "greeting" in system.lower():
+        return "greeting", "Hi there! I'm your visa application assistant. Which country would you like to visit?"
+
+    return "chat", "That sounds great! What is the main purpose of your trip - study, work, or tourism?"
+
+
+# ========== LATENCY / USAGE ==========
+
+def sample_latency(kind: str) -> float:
+    median_ms, sigma = LATENCY_PROFILES.get(kind, [DEFAULT_MEDIAN_MS, DEFAULT_SIGMA])
+    return rng.lognormvariate(0, sigma) * median_ms / 1000.0
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def build_usage(messages: List[Dict], completion: str) -> Dict:
+    prompt_tokens = sum(count_tokens(_message_text(m)) + 4 for m in messages)
+    if _has_image(messages):
+        prompt_tokens += 765
+    completion_tokens = count_tokens(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+# ========== ENDPOINTS ==========
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "gpt-4o")
+    max_tokens = body.get("max_tokens") or 500
+
+    kind, text = classify(messages)
+    stats["requests"] += 1
+    stats["by_kind"][kind] = stats["by_kind"].get(kind, 0) + 1
+
+    # Rough truncation so tight max_tokens budgets behave like the real API
+    text = text[:max_tokens * 4]
+
+    if ERROR_RATE and rng.random() < ERROR_RATE:
+        stats["errors_injected"] += 1
+        await asyncio.sleep(0.05)
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit reached (injected)", "type": "requests", "code": "rate_limit_exceeded"}}
+        )
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        return StreamingResponse(
+            _stream_chunks(completion_id, created, model, kind, text),
+            media_type="text/event-stream"
+        )
+
+    await asyncio.sleep(sample_latency(kind))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop"
+        }],
+        "usage": build_usage(messages, text)
+    }
+
+
+async def _stream_chunks(completion_id: str, created: int, model: str, kind: str, text: str):
+    # Time to first token ~ the sampled latency; the rest trickles in
+    await asyncio.sleep(sample_latency(kind))
+
+    def chunk(delta: Dict, finish_reason: Optional[str] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for piece in re.findall(r"\S+\s*", text):
+        yield chunk({"content": piece})
+        await asyncio.sleep(STREAM_CHUNK_MS / 1000.0)
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "gpt-4o", "object": "model", "owned_by": "fake"}]}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,113 @@
+"""
+Intent Fast-Path Benchmark
+Replays recorded conversations through the deterministic matcher
+(app/services/intent_extractor.fast_match) and reports how many would skip
+the LLM, how often the fast path agrees with the form the session actually
+ended up on, and the cost per extraction.
+
+Usage:
+    python -m loadtest.intent_benchmark --from-mongo [--limit 5000]
+    python -m loadtest.intent_benchmark --conversations conversations.jsonl --forms forms.json
+
+Exported files: one conversation document per line (history, optional
+matched_form_id / summary / summary_upto) and a JSON list of form documents.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.services.intent_extractor import fast_match
+from app.services.token_budget import fit_user_text
+
+
+def matching_text(conversation: Dict) -> str:
+    """Same conversation text match_form_from_conversation builds"""
+    history = conversation.get("history", [])
+    summary = conversation.get("summary")
+    upto = conversation.get("summary_upto", 0)
+    if summary and upto <= len(history):
+        tail = fit_user_text(history[upto:], settings.MATCHING_CONTEXT_TOKEN_BUDGET)
+        return f"{summary} {tail}".strip()
+    return fit_user_text(history, settings.MATCHING_CONTEXT_TOKEN_BUDGET)
+
+
+def load_files(conversations_path: str, forms_path: str) -> Tuple[List[Dict], List[Dict]]:
+    with open(conversations_path, encoding="utf-8") as f:
+        conversations = [json.loads(line) for line in f if line.strip()]
+    with open(forms_path, encoding="utf-8") as f:
+        forms = json.load(f)
+    return conversations, forms
+
+
+async def load_mongo(limit: int) -> Tuple[List[Dict], List[Dict]]:
+    from app.core.database import (
+        connect_to_mongodb,
+        close_mongodb_connection,
+        get_conversations_collection,
+        get_forms_collection
+    )
+
+    await connect_to_mongodb()
+    try:
+        cursor = get_conversations_collection().find(
+            {"history.0": {"$exists": True}},
+            {"_id": 0, "history": 1, "matched_form_id": 1, "summary": 1, "summary_upto": 1}
+        ).limit(limit)
+        conversations = await cursor.to_list(length=limit)
+        forms = await get_forms_collection().find({}, {"_id": 0, "pages_data": 0, "fields": 0}).to_list(length=None)
+    finally:
+        await close_mongodb_connection()
+    return conversations, forms
+
+
+def run(conversations: List[Dict], forms: List[Dict]):
+    evaluated = hits = labelled_hits = agreements = 0
+    elapsed = 0.0
+
+    for conversation in conversations:
+        text = matching_text(conversation)
+        if not text:
+            continue
+        evaluated += 1
+
+        started = time.perf_counter()
+        form = fast_match(text, forms)
+        elapsed += time.perf_counter() - started
+
+        if form is None:
+            continue
+        hits += 1
+        expected = conversation.get("matched_form_id")
+        if expected:
+            labelled_hits += 1
+            agreements += form.get("form_id") == expected
+
+    print(f"\n📊 Intent fast path over {evaluated} conversations ({len(forms)} forms)")
+    if not evaluated:
+        return
+    print(f"   Fast-path hits: {hits} ({hits / evaluated:.1%}) - these skip topic check + LLM matching")
+    if labelled_hits:
+        print(f"   Agreement:      {agreements}/{labelled_hits} ({agreements / labelled_hits:.1%}) with the recorded matched_form_id")
+    print(f"   Cost:           {elapsed / evaluated * 1e6:.0f}µs per conversation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hit rate of the deterministic form matcher")
+    parser.add_argument("--from-mongo", action="store_true", help="read conversations and forms from MONGODB_URI")
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--conversations", help="JSONL export of conversation documents")
+    parser.add_argument("--forms", help="JSON export of form documents")
+    args = parser.parse_args()
+
+    if args.from_mongo:
+        conversations, forms = asyncio.run(load_mongo(args.limit))
+    elif args.conversations and args.forms:
+        conversations, forms = load_files(args.conversations, args.forms)
+    else:
+        parser.error("use --from-mongo or --conversations + --forms")
+
+    run(conversations, forms)
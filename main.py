@@ -2,24 +2,38 @@
 Immigration Chatbot - Main FastAPI Application
 """
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import connect_to_mongodb, close_mongodb_connection
-from app.api import chat, forms, session
+from app.core.database import connect_to_mongodb, close_mongodb_connection, ensure_indexes
+from app.core.storage import watch_forms_changes, write_behind
+from app.api import chat, forms, session, metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     await connect_to_mongodb()
+    await ensure_indexes()
+    forms_watcher = None
+    if settings.FORMS_CACHE_CHANGE_STREAM:
+        forms_watcher = asyncio.create_task(watch_forms_changes())
+    session_flusher = None
+    if settings.SESSION_WRITE_BEHIND:
+        session_flusher = asyncio.create_task(write_behind.run())
     print("🚀 Immigration Chatbot API Started")
     
     yield
     
     # Shutdown
+    if forms_watcher:
+        forms_watcher.cancel()
+    if session_flusher:
+        session_flusher.cancel()
+        await write_behind.shutdown()
     await close_mongodb_connection()
     print("👋 Immigration Chatbot API Stopped")
 
@@ -43,6 +57,7 @@ app.add_middleware(
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
 app.include_router(forms.router, prefix="/api", tags=["Forms"])
 app.include_router(session.router, prefix="/api", tags=["Session"])
+app.include_router(metrics.router, prefix="/api", tags=["Metrics"])
 
 @app.get("/")
 async def root():
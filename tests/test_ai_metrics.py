@@ -0,0 +1,24 @@
+"""
+AI call metrics: snapshots must stay JSON-serializable
+"""
+
+import json
+
+from app.services.ai_metrics import Histogram, LATENCY_BUCKETS, get_call_site_stats, record_ai_call
+
+
+def test_quantile_past_top_bucket_is_json_safe():
+    histogram = Histogram(LATENCY_BUCKETS)
+    histogram.observe(75.0)
+    assert histogram.quantile(0.95) == "+Inf"
+
+    # Starlette's JSONResponse serializes with allow_nan=False
+    json.dumps(histogram.snapshot(), allow_nan=False)
+
+
+def test_call_site_stats_with_overflow_sample_serialize():
+    record_ai_call("test_overflow_site", "ok", 75.0, prompt_tokens=50000, completion_tokens=10)
+    stats = get_call_site_stats()["test_overflow_site"]
+    assert stats["latency_seconds"]["p95"] == "+Inf"
+    assert stats["prompt_tokens"]["p50"] == "+Inf"
+    json.dumps(stats, allow_nan=False)
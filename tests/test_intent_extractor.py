@@ -0,0 +1,27 @@
+"""
+Deterministic intent fast path: must never pick a form the text does not ask for
+"""
+
+from app.services.intent_extractor import extract_intent, fast_match
+
+FORMS = [
+    {"form_id": "ca-student", "country": "Canada", "visa_type": "Student", "title": "Canada Study Permit"},
+    {"form_id": "ca-tourist", "country": "Canada", "visa_type": "Tourist", "title": "Canada Visitor Visa"},
+]
+
+
+def test_of_course_is_not_a_student_cue():
+    assert "student" not in extract_intent("Of course! I would like to visit Canada next summer")["purposes"]
+
+
+def test_visit_is_a_tourist_cue():
+    match = fast_match("Of course! I would like to visit Canada next summer", FORMS)
+    assert match["form_id"] == "ca-tourist"
+
+
+def test_conflicting_purposes_escalate():
+    assert fast_match("I want to visit Canada to study at a university", FORMS) is None
+
+
+def test_unambiguous_student_intent():
+    assert fast_match("I want to study in Canada", FORMS)["form_id"] == "ca-student"
@@ -0,0 +1,79 @@
+"""
+Write-behind session store: what reaches Mongo after merged turns
+"""
+
+import asyncio
+import copy
+
+from pymongo import ReplaceOne
+
+from app.core import storage
+from app.core.storage import WriteBehindStore, diff_conversation, snapshot_conversation
+
+
+class FakeConversations:
+    """Just enough of the conversations collection for load + bulk_write"""
+
+    def __init__(self, docs):
+        self.docs = {d["session_id"]: copy.deepcopy(d) for d in docs}
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["session_id"])
+        return copy.deepcopy(doc) if doc else None
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            session_id = op._filter["session_id"]
+            if isinstance(op, ReplaceOne):
+                self.docs[session_id] = copy.deepcopy(op._doc)
+                continue
+            doc = self.docs.setdefault(session_id, {"session_id": session_id})
+            for path, value in op._doc.get("$set", {}).items():
+                target = doc
+                *parents, key = path.split(".")
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[key] = copy.deepcopy(value)
+            for path in op._doc.get("$unset", {}):
+                doc.pop(path, None)
+            for path, value in op._doc.get("$inc", {}).items():
+                doc[path] = doc.get(path, 0) + value
+            for path, value in op._doc.get("$push", {}).items():
+                doc.setdefault(path, []).extend(copy.deepcopy(value["$each"]))
+
+
+def test_full_rewrite_drops_fields_removed_by_reset(monkeypatch):
+    history = [{"role": "user", "content": f"message {i}"} for i in range(9)]
+    collection = FakeConversations([{
+        "session_id": "s1",
+        "state": "chatting",
+        "history": history,
+        "answers": {},
+        "topic_state": {"on_topic": True, "scanned_upto": 9}
+    }])
+    monkeypatch.setattr(storage.settings, "SESSION_WRITE_BEHIND", True)
+    monkeypatch.setattr(storage, "get_conversations_collection", lambda: collection)
+    monkeypatch.setattr(storage, "write_behind", WriteBehindStore())
+
+    async def scenario():
+        # Reset: history cleared, topic verdict dropped
+        data = await storage.load_conversation("s1")
+        snapshot = snapshot_conversation(data)
+        data["history"] = []
+        data.pop("topic_state")
+        await storage.save_conversation_delta("s1", diff_conversation(snapshot, data), data)
+
+        # Next turn pushes onto the new history - merges into a full rewrite
+        data = await storage.load_conversation("s1")
+        snapshot = snapshot_conversation(data)
+        data["history"].append({"role": "user", "content": "hi"})
+        await storage.save_conversation_delta("s1", diff_conversation(snapshot, data), data)
+        assert await storage.write_behind.flush() == 1
+
+        # Restart: nothing cached, the document comes from Mongo
+        storage.write_behind = WriteBehindStore()
+        return await storage.load_conversation("s1")
+
+    reloaded = asyncio.run(scenario())
+    assert "topic_state" not in reloaded
+    assert reloaded["history"] == [{"role": "user", "content": "hi"}]